@@ -0,0 +1,509 @@
+"""
+Append one new year (e.g. 2020) to the reduced county-year panel without
+rerunning notebooks 01-08 for every year.
+
+Steps:
+  1. Ingest only the new year's inputs: IHME life expectancy (preprocessed by
+     notebook 01), ACS (per-variable files from notebook 02 if present, otherwise
+     fetched from the Census API), CAMS/ERA5 with the engineered FoT, wet bulb
+     and wind speed features (weather/final_dataset_103_features.pkl, the file
+     notebook 05 reads) and FAO GLW (livestock/county_mean_<year>.csv). Cleaning, feature engineering, merging
+     and renaming follow notebooks 03, 04, 05 and 08.
+  2. Validate the new year's columns against the existing panel's schema.
+  3. Append the year as a new partition (combined_final/partitions/year_<year>.csv)
+     and to the reduced CSV the notebooks read.
+  4. Report drift statistics for the new year against the earlier years.
+  5. Optionally update the model: continue boosting from a saved booster
+     (--continue-model) or run a short Bayesian search warm-started from a
+     previous cv_results_ file and the shared search-history store (--warm-search
+     with --cv-results, plus --cv-features the first time that run is imported).
+
+Usage (from the repository root):
+    python scripts/append_year.py 2020
+    python scripts/append_year.py 2020 --continue-model models/model_b.json --rounds 200
+    python scripts/append_year.py 2020 --warm-search --n-iter 15 \
+        --cv-results data_cleaned/outputs_cleaned/modeling/xgboost/revision/model_b_cv_results.csv \
+        --cv-features model_b_features.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import requests
+import xgboost as xgb
+from scipy.stats import ks_2samp
+from sklearn.metrics import r2_score
+from sklearn.model_selection import GroupShuffleSplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.search_history import SearchHistoryStore, run_warm_bayes_xgb  # noqa: E402
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+PANEL_PATH = Path('data_cleaned/combined_final/final_combined_all_variables_reduced.csv')
+PARTITION_DIR = Path('data_cleaned/combined_final/partitions')
+PREPROCESSED_LIFE_DIR = Path('data_cleaned/processed/preprocessed_fips_life_expectancy')
+ACS_DIR = Path('data_cleaned/processed/acs_individual_variables')
+WEATHER_DIR = Path('data_cleaned/weather')
+WEATHER_FEATURES_PATH = WEATHER_DIR / 'final_dataset_103_features.pkl'
+LIVESTOCK_DIR = Path('data_cleaned/livestock')
+REVISION_DIR = Path('data_cleaned/outputs_cleaned/modeling/xgboost/revision')
+OUTPUT_DIR = Path('data_cleaned/outputs_cleaned/modeling/xgboost/incremental')
+SEARCH_HISTORY_DIR = Path('data_cleaned/outputs_cleaned/modeling/xgboost/search_history')
+
+TARGET_COL = 'Mean Life Expectancy'
+IDENTIFIER_COLS = ['County', 'State', 'Year', 'Fips']
+CENSUS_ERROR_CODE = -666666666
+PSI_ALERT = 0.25
+
+STANDARD_VARIABLES = {
+    'B19013_001E': 'Median Household Income',
+    'B01003_001E': 'Total Population',
+    'B19083_001E': 'Gini Index',
+    'B01002_001E': 'Median Age',
+    'B03003_003E': 'Hispanic Population',
+    'B02001_003E': 'Black Population',
+    'B02001_002E': 'White Population',
+    'B25044_003E': 'No Vehicle (Owner)',
+    'B25044_010E': 'No Vehicle (Renter)',
+    'B25044_001E': 'Total Occupied Households',
+    'B25070_010E': 'Rent Burden Count (+50%)',
+    'B25070_001E': 'Rent Denominator',
+    'B11003_016E': 'Total Families (Single Mother)',
+    'B11003_001E': 'Total Families',
+}
+SUMMARY_VARIABLES = {
+    'S1701_C03_001E': 'Poverty Rate',
+    'S2301_C04_001E': 'Unemployment Rate',
+    'S1810_C03_001E': 'Disability Rate',
+    'S1501_C02_015E': "Bachelor's Degree or Higher (%)",
+    'S1501_C02_014E': 'High School Degree or Higher (%)',
+}
+RAW_COUNT_COLUMNS = [
+    'White Population', 'Hispanic Population', 'Black Population',
+    'No Vehicle (Owner)', 'No Vehicle (Renter)', 'Total Occupied Households',
+    'Rent Burden Count (+50%)', 'Rent Denominator',
+    'Total Families (Single Mother)', 'Total Families',
+]
+ENGINEERED_ACS_COLUMNS = [
+    'White Population (%)', 'Hispanic Population (%)', 'Black Population (%)',
+    'Households with No Vehicle (%)', 'Rent Burden (+50% of HI)', 'Single Mother Families (%)',
+]
+LIVESTOCK_COLUMNS = ['Buffalo', 'Cattle', 'Chicken', 'Duck', 'Goat', 'Horse', 'Pig', 'Sheep']
+REDUNDANT_MERGE_COLUMNS = ['State_FIPS', 'County_FIPS', 'STATEFP', 'COUNTYFP',
+                           'GEOID', 'NAME', 'year', 'year_y', 'year_x', 'fips', 'MeanLifeExpectency']
+
+
+class SchemaError(ValueError):
+    pass
+
+
+# ============================================================
+# INGESTION (notebooks 01-05, 08 for a single year)
+# ============================================================
+def load_life_expectancy(year):
+    path = PREPROCESSED_LIFE_DIR / f'preprocessed_life_fips_{year}.csv'
+    life_df = pd.read_csv(path, dtype={'State_FIPS': str, 'County_FIPS': str})
+    life_df['State_FIPS'] = life_df['State_FIPS'].str.zfill(2)
+    life_df['County_FIPS'] = life_df['County_FIPS'].str.zfill(3)
+    return life_df
+
+
+def fetch_acs(year, api_key):
+    """One Census API request per endpoint instead of one per variable."""
+    frames = []
+    for endpoint, variables in [('acs5', STANDARD_VARIABLES), ('acs5/subject', SUMMARY_VARIABLES)]:
+        print(f"Fetching {len(variables)} ACS variables from {endpoint} for {year}...")
+        response = requests.get(
+            f'https://api.census.gov/data/{year}/{endpoint}',
+            params={'get': ','.join(variables), 'for': 'county:*', 'in': 'state:*', 'key': api_key},
+        )
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch ACS {endpoint} for {year}. Status code: {response.status_code}")
+        acs_data = response.json()
+        acs_df = pd.DataFrame(columns=acs_data[0], data=acs_data[1:])
+        acs_df = acs_df.rename(columns={**variables, 'state': 'State_FIPS', 'county': 'County_FIPS'})
+        for name in variables.values():
+            acs_df[name] = pd.to_numeric(acs_df[name], errors='coerce')
+        frames.append(acs_df.set_index(['State_FIPS', 'County_FIPS']))
+    return pd.concat(frames, axis=1).reset_index()
+
+
+def load_acs(year, life_df, api_key=None):
+    names = list(STANDARD_VARIABLES.values()) + list(SUMMARY_VARIABLES.values())
+    paths = [ACS_DIR / f'dataset_with_{name}_{year}.csv' for name in names]
+    keys = ['County', 'State', 'State_FIPS', 'County_FIPS']
+
+    if all(path.exists() for path in paths):
+        print(f"Combining {len(paths)} ACS variable files for {year} (notebook 03)...")
+        combined = life_df
+        for name, path in zip(names, paths):
+            acs_df = pd.read_csv(path, dtype={'State_FIPS': str, 'County_FIPS': str})
+            acs_df['State_FIPS'] = acs_df['State_FIPS'].str.zfill(2)
+            acs_df['County_FIPS'] = acs_df['County_FIPS'].str.zfill(3)
+            combined = combined.merge(acs_df[keys + [name]], on=keys, how='inner')
+        return combined
+
+    if api_key is None:
+        raise FileNotFoundError(
+            f"ACS variable files for {year} are missing from {ACS_DIR}. "
+            "Set CENSUS_API_KEY or pass --census-api-key to fetch them."
+        )
+    return life_df.merge(fetch_acs(year, api_key), on=['State_FIPS', 'County_FIPS'], how='inner')
+
+
+def clean_acs(df):
+    """Notebook 04: listwise deletion, Census error codes, engineered percentages."""
+    n_start = len(df)
+    df = df.dropna()
+    numeric_cols = df.select_dtypes(include='number').columns
+    df = df[(df[numeric_cols] != CENSUS_ERROR_CODE).all(axis=1)].copy()
+    print(f"ACS cleaning: {n_start:,} -> {len(df):,} counties")
+
+    df['White Population (%)'] = df['White Population'] / df['Total Population'] * 100
+    df['Hispanic Population (%)'] = df['Hispanic Population'] / df['Total Population'] * 100
+    df['Black Population (%)'] = df['Black Population'] / df['Total Population'] * 100
+    df['Households with No Vehicle (%)'] = (
+        (df['No Vehicle (Owner)'] + df['No Vehicle (Renter)']) / df['Total Occupied Households']
+    ) * 100
+    df['Rent Burden (+50% of HI)'] = df['Rent Burden Count (+50%)'] / df['Rent Denominator'] * 100
+    df['Single Mother Families (%)'] = df['Total Families (Single Mother)'] / df['Total Families'] * 100
+
+    df = df.drop(columns=RAW_COUNT_COLUMNS)
+    return df.rename(columns={'mean_life_expectancy': TARGET_COL})
+
+
+def load_weather(year, weather_path=WEATHER_FEATURES_PATH):
+    """Notebook 05 weather input for one year.
+
+    The panel keeps engineered columns (FoT ... above75ᵗʰ percentile, Wet bulb
+    temperature, 10m wind speed) that are computed from sub-annual CAMS/ERA5
+    fields with thresholds pooled over all years. The per-year weather/<year>.pkl
+    files only hold annual means, so the new year has to come from the
+    engineered dataset once it has been extended to that year.
+    """
+    weather_df = pd.read_pickle(weather_path)
+    weather_df = weather_df[weather_df['year'] == year].copy()
+    if weather_df.empty:
+        raise SchemaError(
+            f"{year} is not in {weather_path}. Extend the engineered weather dataset to {year} "
+            f"(FoT thresholds taken from the existing years) before appending; "
+            f"{WEATHER_DIR / f'{year}.pkl'} only has annual means and lacks the FoT and wet bulb features."
+        )
+    weather_df['fips'] = weather_df['fips'].astype(str).str.zfill(5)
+    return weather_df
+
+
+def load_livestock(year):
+    livestock_df = pd.read_csv(LIVESTOCK_DIR / f'county_mean_{year}.csv')
+    livestock_df['fips'] = (
+        livestock_df['STATEFP'].astype(str).str.zfill(2) + livestock_df['COUNTYFP'].astype(str).str.zfill(3)
+    )
+    return livestock_df
+
+
+def to_title_case_preserve_special(name):
+    """Notebook 08 weather renaming: Title Case, leaving LaTeX, µ and superscripts alone."""
+    words = []
+    for word in name.split(' '):
+        if not word:
+            continue
+        if word[0] in ('µ', 'μ') or not word[0].isalpha():
+            words.append(word)
+        else:
+            words.append(word[0].upper() + word[1:])
+    return ' '.join(words)
+
+
+def build_year(year, api_key=None):
+    print('=' * 70)
+    print(f'INGESTING {year}')
+    print('=' * 70)
+    life_df = load_life_expectancy(year)
+    demographics_df = clean_acs(load_acs(year, life_df, api_key))
+    demographics_df['fips'] = demographics_df['State_FIPS'] + demographics_df['County_FIPS']
+    demographics_df['Year'] = year
+
+    weather_df = load_weather(year)
+    livestock_df = load_livestock(year)
+    merged = demographics_df.merge(weather_df, on='fips', how='inner')
+    print(f"Demographics + weather: {len(merged):,} counties")
+    merged = merged.merge(livestock_df, on='fips', how='inner')
+    print(f"+ livestock: {len(merged):,} counties")
+
+    merged['Fips'] = merged['fips'].astype(int)
+    merged = merged.drop(columns=[col for col in REDUNDANT_MERGE_COLUMNS if col in merged.columns])
+
+    non_weather = set(IDENTIFIER_COLS + [TARGET_COL] + LIVESTOCK_COLUMNS + ENGINEERED_ACS_COLUMNS
+                      + list(STANDARD_VARIABLES.values()) + list(SUMMARY_VARIABLES.values()))
+    weather_mapping = {col: to_title_case_preserve_special(col) for col in merged.columns if col not in non_weather}
+    return merged.rename(columns=weather_mapping)
+
+
+# ============================================================
+# SCHEMA VALIDATION AND PARTITIONS
+# ============================================================
+def validate_schema(new_df, panel_columns, panel_dtypes):
+    missing = [col for col in panel_columns if col not in new_df.columns]
+    if missing:
+        raise SchemaError(f"New year is missing {len(missing)} panel columns: {missing}")
+
+    extra = [col for col in new_df.columns if col not in panel_columns]
+    if extra:
+        print(f"Dropping {len(extra)} columns not in the panel schema (removed in notebook 08)")
+    new_df = new_df[panel_columns].copy()
+
+    non_numeric = [col for col in panel_columns
+                   if pd.api.types.is_numeric_dtype(panel_dtypes[col])
+                   and not pd.api.types.is_numeric_dtype(new_df[col])]
+    if non_numeric:
+        raise SchemaError(f"Columns are numeric in the panel but not in the new year: {non_numeric}")
+
+    n_rows = len(new_df)
+    new_df = new_df.dropna()
+    if len(new_df) < n_rows:
+        print(f"Listwise deletion: dropped {n_rows - len(new_df):,} counties with missing values")
+
+    duplicates = new_df.duplicated(subset=['Fips', 'Year']).sum()
+    if duplicates:
+        raise SchemaError(f"New year has {duplicates} duplicate county rows")
+    print(f"Schema check passed: {len(new_df):,} counties x {len(panel_columns)} columns")
+    return new_df
+
+
+def ensure_partitions(panel_df):
+    """Split the existing reduced panel into per-year partitions the first time append mode runs."""
+    PARTITION_DIR.mkdir(parents=True, exist_ok=True)
+    for year, year_df in panel_df.groupby('Year'):
+        path = PARTITION_DIR / f'year_{year}.csv'
+        if not path.exists():
+            year_df.to_csv(path, index=False)
+
+
+def append_partition(new_df, year):
+    partition_path = PARTITION_DIR / f'year_{year}.csv'
+    new_df.to_csv(partition_path, index=False)
+    new_df.to_csv(PANEL_PATH, mode='a', header=False, index=False)
+    print(f"Partition saved: {partition_path}")
+    print(f"Appended {len(new_df):,} rows to {PANEL_PATH}")
+
+
+# ============================================================
+# DRIFT
+# ============================================================
+def population_stability_index(reference, current, n_bins=10):
+    edges = np.unique(np.quantile(reference, np.linspace(0, 1, n_bins + 1)))
+    if len(edges) < 3:
+        return 0.0
+    edges[0], edges[-1] = -np.inf, np.inf
+    ref_frac = np.histogram(reference, edges)[0] / len(reference)
+    cur_frac = np.histogram(current, edges)[0] / len(current)
+    ref_frac = np.clip(ref_frac, 1e-6, None)
+    cur_frac = np.clip(cur_frac, 1e-6, None)
+    return float(np.sum((cur_frac - ref_frac) * np.log(cur_frac / ref_frac)))
+
+
+def drift_report(panel_df, new_df, year):
+    reference = panel_df[panel_df['Year'] < year]
+    last_year = reference[reference['Year'] == reference['Year'].max()]
+    rows = []
+    for col in [col for col in new_df.columns if col not in IDENTIFIER_COLS]:
+        ref_values = reference[col].to_numpy(dtype=float)
+        new_values = new_df[col].to_numpy(dtype=float)
+        ref_std = ref_values.std()
+        rows.append({
+            'Feature': col,
+            'Reference Mean': ref_values.mean(),
+            f'{year} Mean': new_values.mean(),
+            'Previous Year Mean': last_year[col].mean(),
+            'Standardized Mean Difference': (new_values.mean() - ref_values.mean()) / ref_std if ref_std > 0 else 0.0,
+            'Std Ratio': new_values.std() / ref_std if ref_std > 0 else np.nan,
+            'KS Statistic': ks_2samp(ref_values, new_values).statistic,
+            'PSI': population_stability_index(ref_values, new_values),
+        })
+    drift_df = pd.DataFrame(rows).sort_values('PSI', ascending=False).reset_index(drop=True)
+    drift_df['Drift Alert'] = drift_df['PSI'] > PSI_ALERT
+    return drift_df
+
+
+# ============================================================
+# MODEL UPDATE
+# ============================================================
+def prepare_xy(df, extra_drop=None):
+    drop_cols = IDENTIFIER_COLS + [TARGET_COL]
+    if extra_drop is not None:
+        drop_cols = drop_cols + list(extra_drop)
+    drop_cols = [col for col in drop_cols if col in df.columns]
+
+    X = df.drop(columns=drop_cols)
+    y = df[TARGET_COL]
+    groups = df['Fips']
+    return X, y, groups
+
+
+def county_split(X, y, groups):
+    gss = GroupShuffleSplit(n_splits=1, test_size=0.2, random_state=42)
+    return next(gss.split(X, y, groups=groups))
+
+
+def continue_boosting(panel_df, year, model_path, params_path, rounds):
+    """Add `rounds` trees to a saved booster using the appended panel's county-split training rows."""
+    X, y, groups = prepare_xy(panel_df)
+    train_idx, test_idx = county_split(X, y, groups)
+    test_new = test_idx[panel_df['Year'].to_numpy()[test_idx] == year]
+
+    booster = xgb.Booster()
+    booster.load_model(model_path)
+    if booster.feature_names is not None and list(booster.feature_names) != list(X.columns):
+        raise SchemaError('Saved model features do not match the panel features')
+
+    with open(params_path, encoding='utf-8') as f:
+        params = json.load(f)
+    params.pop('n_estimators', None)
+    params.update({'objective': 'reg:squarederror', 'tree_method': 'hist', 'seed': 42})
+
+    dtest = xgb.DMatrix(X.iloc[test_idx], label=y.iloc[test_idx])
+    dtest_new = xgb.DMatrix(X.iloc[test_new], label=y.iloc[test_new])
+    before = {'test_r2': r2_score(y.iloc[test_idx], booster.predict(dtest)),
+              f'test_r2_{year}': r2_score(y.iloc[test_new], booster.predict(dtest_new))}
+
+    dtrain = xgb.DMatrix(X.iloc[train_idx], label=y.iloc[train_idx])
+    booster = xgb.train(params, dtrain, num_boost_round=rounds, xgb_model=booster)
+    after = {'test_r2': r2_score(y.iloc[test_idx], booster.predict(dtest)),
+             f'test_r2_{year}': r2_score(y.iloc[test_new], booster.predict(dtest_new))}
+
+    output_path = OUTPUT_DIR / f'{Path(model_path).stem}_{year}.json'
+    booster.save_model(str(output_path))
+    print(f"Continued boosting: +{rounds} rounds, model saved to {output_path}")
+    for key in before:
+        print(f"  {key}: {before[key]:.4f} -> {after[key]:.4f}")
+    return booster
+
+
+def previous_run_id(cv_results_path):
+    return Path(cv_results_path).stem.replace('_cv_results', '')
+
+
+def load_feature_list(cv_results_path, cv_features_path=None):
+    """Features the previous search was trained on: --cv-features, else a <run_id>_features.json sidecar.
+
+    Accepts a JSON list or a text file with one feature name per line; None if neither exists.
+    """
+    if cv_features_path is None:
+        cv_features_path = Path(cv_results_path).with_name(f'{previous_run_id(cv_results_path)}_features.json')
+        if not cv_features_path.exists():
+            return None
+    text = Path(cv_features_path).read_text(encoding='utf-8')
+    if Path(cv_features_path).suffix == '.json':
+        return list(json.loads(text))
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def warm_start_search(panel_df, year, cv_results_path, n_iter, previous_features=None):
+    """Short Bayesian search seeded from the search-history store and the previous cv_results_.
+
+    The previous run is registered with the features it was trained on (e.g. Model B's
+    45, including Smoking Rate and is_post_2015), not the reduced panel's, so the
+    store's relevance scores compare the right feature sets.
+    """
+    X, y, groups = prepare_xy(panel_df)
+    train_idx, _ = county_split(X, y, groups)
+    X_train, y_train, groups_train = X.iloc[train_idx], y.iloc[train_idx], groups.iloc[train_idx]
+
+    store = SearchHistoryStore(SEARCH_HISTORY_DIR)
+    run_id = previous_run_id(cv_results_path)
+    if run_id not in store.entries:
+        store.import_run(run_id, cv_results_path, features=previous_features, target=TARGET_COL)
+
+    bayes, _, report = run_warm_bayes_xgb(
+        X_train, y_train, groups_train,
+        section_name=f'Incremental update with {year}',
+        store=store,
+        run_id=f'incremental_{year}',
+        target=TARGET_COL,
+        n_iter=n_iter,
+    )
+
+    with open(OUTPUT_DIR / f'incremental_{year}_best_params.json', 'w', encoding='utf-8') as f:
+        json.dump({k: v.item() if hasattr(v, 'item') else v for k, v in bayes.best_params_.items()}, f, indent=2)
+    pd.DataFrame(bayes.cv_results_).to_csv(OUTPUT_DIR / f'incremental_{year}_cv_results.csv', index=False)
+    with open(OUTPUT_DIR / f'incremental_{year}_warm_start_report.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return bayes
+
+
+# ============================================================
+# MAIN
+# ============================================================
+def main():
+    parser = argparse.ArgumentParser(description='Append a new year to the county-year panel.')
+    parser.add_argument('year', type=int)
+    parser.add_argument('--census-api-key', default=os.getenv('CENSUS_API_KEY'))
+    parser.add_argument('--dry-run', action='store_true', help='Validate and report drift without appending')
+    parser.add_argument('--continue-model', type=Path, help='Saved XGBoost booster to continue boosting from')
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--params', type=Path, default=REVISION_DIR / 'model_b_best_params.json')
+    parser.add_argument('--warm-search', action='store_true')
+    parser.add_argument('--cv-results', type=Path,
+                        help='cv_results_ CSV of the previous search to seed from (required with --warm-search)')
+    parser.add_argument('--cv-features', type=Path,
+                        help="Features that search was trained on: JSON list or one name per line "
+                             "(default: <run_id>_features.json next to --cv-results)")
+    parser.add_argument('--n-iter', type=int, default=15)
+    args = parser.parse_args()
+
+    previous_features = None
+    if args.warm_search:
+        if args.cv_results is None:
+            parser.error('--warm-search requires --cv-results, the *_cv_results.csv of the search to seed from')
+        if not args.cv_results.exists():
+            parser.error(f'--cv-results {args.cv_results} does not exist')
+        if args.cv_features is not None and not args.cv_features.exists():
+            parser.error(f'--cv-features {args.cv_features} does not exist')
+        previous_features = load_feature_list(args.cv_results, args.cv_features)
+        run_id = previous_run_id(args.cv_results)
+        if previous_features is None and run_id not in SearchHistoryStore(SEARCH_HISTORY_DIR).entries:
+            parser.error(f"'{run_id}' is not in the search-history store yet; pass --cv-features "
+                         'with the feature list that search was trained on')
+
+    panel_df = pd.read_csv(PANEL_PATH)
+    if args.year in panel_df['Year'].unique():
+        sys.exit(f"{args.year} is already in {PANEL_PATH}")
+
+    new_df = validate_schema(build_year(args.year, args.census_api_key), panel_df.columns.tolist(), panel_df.dtypes)
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    drift_df = drift_report(panel_df, new_df, args.year)
+    drift_path = OUTPUT_DIR / f'drift_{args.year}.csv'
+    drift_df.to_csv(drift_path, index=False)
+
+    print('\n' + '=' * 70)
+    print(f'DRIFT: {args.year} vs. {panel_df["Year"].min()}-{panel_df["Year"].max()}')
+    print('=' * 70)
+    for _, row in drift_df.head(10).iterrows():
+        flag = '  <- ALERT' if row['Drift Alert'] else ''
+        print(f"{row['Feature'][:45]:<45} PSI = {row['PSI']:.3f} | SMD = {row['Standardized Mean Difference']:+.2f} "
+              f"| KS = {row['KS Statistic']:.3f}{flag}")
+    print(f"{int(drift_df['Drift Alert'].sum())} features above PSI {PSI_ALERT}. Full report: {drift_path}")
+
+    if args.dry_run:
+        return
+
+    ensure_partitions(panel_df)
+    append_partition(new_df, args.year)
+    panel_df = pd.concat([panel_df, new_df], ignore_index=True)
+
+    if args.continue_model is not None:
+        continue_boosting(panel_df, args.year, args.continue_model, args.params, args.rounds)
+    if args.warm_search:
+        warm_start_search(panel_df, args.year, args.cv_results, args.n_iter, previous_features)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,37 +1,313 @@
-import urllib.request
+"""
+Discover candidate county-level covariates in the Socrata open-data catalog
+(data.cdc.gov and other Socrata portals).
+
+`crawl` fetches every catalog page for many keywords concurrently, with a cap on
+in-flight requests, a global request rate limit, retries with exponential backoff
+and full pagination. Results are stored in a local SQLite index with an FTS5
+table, so `search` runs offline against everything crawled so far.
+
+Usage (from the repository root):
+    python scripts/discover_cdc_datasets.py crawl obesity smoking "physical inactivity"
+    python scripts/discover_cdc_datasets.py crawl --keywords-file keywords.txt --domains data.cdc.gov
+    python scripts/discover_cdc_datasets.py search "obesity prevalence" --county-only --updated-after 2020-01-01
+
+`--api-url` points the crawler at any catalog-compatible endpoint, e.g. a local
+stand-in server.
+"""
+
+import argparse
+import asyncio
+import http.client
 import json
-import ssl
-
-def search_socrata(query):
-    # Use SSL context to avoid certificate errors
-    ctx = ssl.create_default_context()
-    ctx.check_hostname = False
-    ctx.verify_mode = ssl.CERT_NONE
-    
-    url = f"http://api.us.socrata.com/api/catalog/v1?search={query}&limit=20"
-    
-    try:
-        with urllib.request.urlopen(url, context=ctx) as response:
-            data = json.loads(response.read().decode())
-            
-        print(f"\n--- Results for '{query}' ---")
-        if 'results' in data:
-            for item in data['results']:
-                res = item['resource']
-                # Filter for county level relevance
-                name = res.get('name', '')
-                desc = res.get('description', '')
-                domain = item['metadata']['domain']
-                
-                if 'county' in name.lower() or 'county' in desc.lower():
-                    print(f"ID: {res['id']}")
-                    print(f"Name: {name}")
-                    print(f"Domain: {domain}")
-                    print(f"Updated: {res.get('updatedAt', 'N/A')}")
-                    print("-" * 30)
-                    
-    except Exception as e:
-        print(f"Error: {e}")
-
-search_socrata("obesity")
-search_socrata("smoking")
+import random
+import sqlite3
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+API_URL = 'https://api.us.socrata.com/api/catalog/v1'
+INDEX_PATH = Path('data/catalog/socrata_catalog.db')
+
+DEFAULT_KEYWORDS = ['obesity', 'smoking']
+PAGE_SIZE = 100
+MAX_OFFSET = 10000  # The catalog API rejects offset + limit beyond this
+MAX_CONCURRENCY = 8
+REQUESTS_PER_SECOND = 5.0
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+REQUEST_TIMEOUT = 30
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    description TEXT,
+    domain TEXT,
+    category TEXT,
+    updated_at TEXT,
+    permalink TEXT,
+    columns TEXT,
+    county_relevant INTEGER,
+    fetched_at TEXT
+);
+CREATE TABLE IF NOT EXISTS dataset_keywords (
+    id TEXT,
+    keyword TEXT,
+    PRIMARY KEY (id, keyword)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS datasets_fts USING fts5(
+    id UNINDEXED, name, description, columns
+);
+"""
+
+
+# ============================================================
+# HTTP
+# ============================================================
+class RateLimiter:
+    """Spaces request start times at least 1 / rate seconds apart across all tasks."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next_time = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_time - now
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_time = max(now, self._next_time) + self.interval
+
+
+def _get_json(url):
+    request = urllib.request.Request(url, headers={'Accept': 'application/json'})
+    with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+        return json.loads(response.read().decode())
+
+
+async def fetch_page(api_url, params, semaphore, limiter, max_retries=MAX_RETRIES):
+    url = f"{api_url}?{urllib.parse.urlencode(params)}"
+    for attempt in range(max_retries + 1):
+        retry_after = None
+        async with semaphore:
+            await limiter.wait()
+            try:
+                return await asyncio.to_thread(_get_json, url)
+            except urllib.error.HTTPError as e:
+                if e.code not in RETRY_STATUS_CODES or attempt == max_retries:
+                    raise
+                retry_after = e.headers.get('Retry-After')
+                error = f"HTTP {e.code}"
+            except (OSError, http.client.HTTPException) as e:
+                # URLError, timeouts, and the connection errors urllib raises unwrapped from
+                # getresponse()/read(): RemoteDisconnected, ConnectionResetError, IncompleteRead
+                if attempt == max_retries:
+                    raise
+                error = f"{type(e).__name__}: {e}"
+
+        # Back off outside the semaphore so other requests can proceed
+        if retry_after is not None and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            delay = BACKOFF_BASE * 2 ** attempt + random.uniform(0, BACKOFF_BASE)
+        print(f"  Retry {attempt + 1}/{max_retries} for {params.get('q')!r} "
+              f"offset {params.get('offset')} in {delay:.1f}s ({error})")
+        await asyncio.sleep(delay)
+
+
+async def crawl_keyword(keyword, api_url, domains, semaphore, limiter, page_size=PAGE_SIZE):
+    params = {'q': keyword, 'limit': page_size, 'offset': 0, 'only': 'dataset'}
+    if domains:
+        params['domains'] = ','.join(domains)
+
+    first_page = await fetch_page(api_url, params, semaphore, limiter)
+    total = min(first_page.get('resultSetSize', 0), MAX_OFFSET)
+    offsets = range(page_size, total, page_size)
+    pages = await asyncio.gather(*[
+        fetch_page(api_url, {**params, 'offset': offset}, semaphore, limiter)
+        for offset in offsets
+    ])
+
+    results = list(first_page.get('results', []))
+    for page in pages:
+        results.extend(page.get('results', []))
+    print(f"  '{keyword}': {len(results)} of {first_page.get('resultSetSize', 0)} results "
+          f"({len(offsets) + 1} pages)")
+    return keyword, results
+
+
+async def crawl(keywords, api_url=API_URL, domains=None,
+                max_concurrency=MAX_CONCURRENCY, requests_per_second=REQUESTS_PER_SECOND):
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = RateLimiter(requests_per_second)
+    outcomes = await asyncio.gather(
+        *[crawl_keyword(keyword, api_url, domains, semaphore, limiter) for keyword in keywords],
+        return_exceptions=True,
+    )
+
+    crawled = []
+    for keyword, outcome in zip(keywords, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"  Error for '{keyword}': {outcome}")
+        else:
+            crawled.append(outcome)
+    return crawled
+
+
+# ============================================================
+# LOCAL INDEX
+# ============================================================
+def open_index(index_path=INDEX_PATH):
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(index_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _parse_item(item):
+    resource = item.get('resource', {})
+    name = resource.get('name') or ''
+    description = resource.get('description') or ''
+    columns = ' '.join(resource.get('columns_name') or [])
+    county_relevant = any('county' in text.lower() for text in (name, description, columns))
+    return {
+        'id': resource.get('id'),
+        'name': name,
+        'description': description,
+        'domain': item.get('metadata', {}).get('domain'),
+        'category': item.get('classification', {}).get('domain_category'),
+        'updated_at': resource.get('updatedAt'),
+        'permalink': item.get('permalink'),
+        'columns': columns,
+        'county_relevant': int(county_relevant),
+    }
+
+
+def store_results(conn, crawled):
+    fetched_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    n_stored = 0
+    with conn:
+        for keyword, results in crawled:
+            for item in results:
+                row = _parse_item(item)
+                if row['id'] is None:
+                    continue
+                conn.execute(
+                    """INSERT OR REPLACE INTO datasets
+                       (id, name, description, domain, category, updated_at, permalink,
+                        columns, county_relevant, fetched_at)
+                       VALUES (:id, :name, :description, :domain, :category, :updated_at,
+                               :permalink, :columns, :county_relevant, :fetched_at)""",
+                    {**row, 'fetched_at': fetched_at},
+                )
+                conn.execute('DELETE FROM datasets_fts WHERE id = ?', (row['id'],))
+                conn.execute(
+                    'INSERT INTO datasets_fts (id, name, description, columns) VALUES (?, ?, ?, ?)',
+                    (row['id'], row['name'], row['description'], row['columns']),
+                )
+                conn.execute(
+                    'INSERT OR IGNORE INTO dataset_keywords (id, keyword) VALUES (?, ?)',
+                    (row['id'], keyword),
+                )
+                n_stored += 1
+    return n_stored
+
+
+def _fts_query(query):
+    """Quote each term as an FTS5 phrase so input like "covid-19" is not parsed as query syntax."""
+    terms = (query or '').split()
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def search_index(conn, query=None, domain=None, updated_after=None, county_only=False, limit=50):
+    """Full-text search over crawled datasets, best matches first. Every query term must match."""
+    clauses, params = [], []
+    match = _fts_query(query)
+    if match:
+        sql = """SELECT d.*, bm25(datasets_fts) AS score FROM datasets_fts
+                 JOIN datasets d ON d.id = datasets_fts.id
+                 WHERE datasets_fts MATCH ?"""
+        params.append(match)
+    else:
+        sql = "SELECT d.*, 0 AS score FROM datasets d WHERE 1 = 1"
+    if domain:
+        clauses.append('d.domain = ?')
+        params.append(domain)
+    if updated_after:
+        clauses.append('d.updated_at >= ?')
+        params.append(updated_after)
+    if county_only:
+        clauses.append('d.county_relevant = 1')
+    for clause in clauses:
+        sql += f" AND {clause}"
+    sql += " ORDER BY score, d.updated_at DESC LIMIT ?"
+    params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+# ============================================================
+# CLI
+# ============================================================
+def main():
+    parser = argparse.ArgumentParser(description='Socrata catalog crawler and offline dataset index.')
+    parser.add_argument('--index', type=Path, default=INDEX_PATH)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    crawl_parser = subparsers.add_parser('crawl', help='Fetch catalog entries into the local index')
+    crawl_parser.add_argument('keywords', nargs='*')
+    crawl_parser.add_argument('--keywords-file', type=Path)
+    crawl_parser.add_argument('--domains', nargs='+')
+    crawl_parser.add_argument('--api-url', default=API_URL)
+    crawl_parser.add_argument('--max-concurrency', type=int, default=MAX_CONCURRENCY)
+    crawl_parser.add_argument('--rate', type=float, default=REQUESTS_PER_SECOND,
+                              help='Maximum requests per second')
+
+    search_parser = subparsers.add_parser('search', help='Search the local index offline')
+    search_parser.add_argument('query', nargs='?')
+    search_parser.add_argument('--domain')
+    search_parser.add_argument('--updated-after', help='ISO date, e.g. 2020-01-01')
+    search_parser.add_argument('--county-only', action='store_true')
+    search_parser.add_argument('--limit', type=int, default=50)
+
+    args = parser.parse_args()
+    conn = open_index(args.index)
+
+    if args.command == 'crawl':
+        keywords = list(args.keywords)
+        if args.keywords_file is not None:
+            keywords += [line.strip() for line in args.keywords_file.read_text().splitlines() if line.strip()]
+        keywords = list(dict.fromkeys(keywords or DEFAULT_KEYWORDS))
+
+        print(f"Crawling {len(keywords)} keywords from {args.api_url}...")
+        start = time.perf_counter()
+        crawled = asyncio.run(crawl(keywords, args.api_url, args.domains, args.max_concurrency, args.rate))
+        n_stored = store_results(conn, crawled)
+        n_total = conn.execute('SELECT COUNT(*) FROM datasets').fetchone()[0]
+        print(f"Stored {n_stored} entries in {time.perf_counter() - start:.1f} s. "
+              f"Index now holds {n_total} datasets: {args.index}")
+    else:
+        rows = search_index(conn, args.query, args.domain, args.updated_after, args.county_only, args.limit)
+        print(f"\n--- {len(rows)} results for '{args.query or '*'}' ---")
+        for row in rows:
+            print(f"ID: {row['id']}")
+            print(f"Name: {row['name']}")
+            print(f"Domain: {row['domain']}")
+            print(f"Updated: {row['updated_at'] or 'N/A'}")
+            print(f"County relevant: {'yes' if row['county_relevant'] else 'no'}")
+            print("-" * 30)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
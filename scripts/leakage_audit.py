@@ -0,0 +1,252 @@
+"""
+Leakage audit for county-year outcome models.
+
+Generalizes fast_check_leakage.py: instead of one random split vs. one county
+split, every split strategy is repeated over several seeds and the fits run
+concurrently in a process pool. The feature matrix is built once as a float32
+array and memory-mapped read-only into the workers by joblib.
+
+The optimism gap of a strategy is the random-split test R² minus the strategy's
+test R² for the same seed, i.e. how much a random split overstates performance
+relative to that notion of "unseen" data.
+
+Usage (from the repository root):
+    python scripts/leakage_audit.py
+    python scripts/leakage_audit.py --target 'CVD Mortality' --seeds 10
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from joblib import Parallel, delayed
+from sklearn.metrics import r2_score
+from sklearn.model_selection import GroupShuffleSplit, ShuffleSplit
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+DATA_PATH = Path('data_cleaned/combined_final/final_combined_all_variables_reduced.csv')
+SHAPEFILE_PATH = Path('data/shapefiles/cb_2019_us_county_20m.shp')
+CENTROID_CACHE_PATH = Path('data_cleaned/processed/county_centroids.csv')
+OUTPUT_DIR = Path('data_cleaned/outputs_cleaned/leakage_audit')
+
+TARGET_COL = 'Mean Life Expectancy'
+IDENTIFIER_COLS = ['County', 'State', 'Year', 'Fips']
+
+STRATEGIES = ['random', 'county', 'state', 'spatial_block', 'leave_years_out']
+TEST_SIZE = 0.2
+N_SEEDS = 5
+SPATIAL_BLOCK_KM = 200
+N_HOLDOUT_YEARS = 2
+GAP_THRESHOLD = 0.1
+
+
+# ============================================================
+# SPLIT GROUPS
+# ============================================================
+def load_county_centroids(shapefile_path=SHAPEFILE_PATH, cache_path=CENTROID_CACHE_PATH):
+    """Projected (EPSG:5070) county centroids in metres, cached as CSV after the first run."""
+    cache_path = Path(cache_path)
+    if cache_path.exists():
+        return pd.read_csv(cache_path)
+
+    import geopandas as gpd
+
+    print(f"Computing county centroids from {shapefile_path}...")
+    counties = gpd.read_file(shapefile_path).to_crs(5070)
+    centroids = counties.geometry.centroid
+    centroid_df = pd.DataFrame({
+        'Fips': counties['GEOID'].astype(int),
+        'x': centroids.x,
+        'y': centroids.y,
+    })
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    centroid_df.to_csv(cache_path, index=False)
+    print(f"Centroid cache saved: {cache_path}")
+    return centroid_df
+
+
+def spatial_block_groups(fips, centroid_df, block_km=SPATIAL_BLOCK_KM):
+    """Assign each row to a square block_km x block_km cell of its county centroid.
+
+    Counties without a centroid (e.g. renamed FIPS codes) fall back to their own group.
+    """
+    block_m = block_km * 1000.0
+    lookup = centroid_df.set_index('Fips')
+    x = lookup['x'].reindex(fips).to_numpy()
+    y = lookup['y'].reindex(fips).to_numpy()
+    missing = np.isnan(x) | np.isnan(y)
+
+    labels = np.empty(len(fips), dtype=object)
+    cells = zip(np.floor(x[~missing] / block_m).astype(int), np.floor(y[~missing] / block_m).astype(int))
+    labels[~missing] = [f"block_{cx}_{cy}" for cx, cy in cells]
+    labels[missing] = [f"fips_{f}" for f in np.asarray(fips)[missing]]
+    if missing.any():
+        print(f"Warning: {np.unique(np.asarray(fips)[missing]).size} counties have no centroid; "
+              "they are treated as their own spatial block.")
+    return pd.factorize(labels)[0].astype(np.int32)
+
+
+def build_split_groups(df, strategies, block_km=SPATIAL_BLOCK_KM):
+    fips = df['Fips'].to_numpy()
+    split_groups = {
+        'county': pd.factorize(fips)[0].astype(np.int32),
+        'state': (fips // 1000).astype(np.int32),
+        'year': df['Year'].to_numpy().astype(np.int32),
+    }
+    if 'spatial_block' in strategies:
+        split_groups['spatial_block'] = spatial_block_groups(fips, load_county_centroids(), block_km)
+    return split_groups
+
+
+def make_split(strategy, seed, n_rows, split_groups, test_size=TEST_SIZE, n_holdout_years=N_HOLDOUT_YEARS):
+    indices = np.arange(n_rows)
+    if strategy == 'random':
+        splitter = ShuffleSplit(n_splits=1, test_size=test_size, random_state=seed)
+        return next(splitter.split(indices))
+    if strategy in ('county', 'state', 'spatial_block'):
+        splitter = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=seed)
+        return next(splitter.split(indices, groups=split_groups[strategy]))
+    if strategy == 'leave_years_out':
+        years = split_groups['year']
+        rng = np.random.default_rng(seed)
+        test_years = rng.choice(np.unique(years), size=n_holdout_years, replace=False)
+        test_mask = np.isin(years, test_years)
+        return indices[~test_mask], indices[test_mask]
+    raise ValueError(f"Unknown split strategy: {strategy}")
+
+
+# ============================================================
+# WORKER
+# ============================================================
+def fit_split(X, y, split_groups, strategy, seed, n_threads):
+    train_idx, test_idx = make_split(strategy, seed, len(y), split_groups)
+
+    model = xgb.XGBRegressor(n_jobs=n_threads, random_state=seed, tree_method='hist')
+    model.fit(X[train_idx], y[train_idx])
+    train_r2 = r2_score(y[train_idx], model.predict(X[train_idx]))
+    test_r2 = r2_score(y[test_idx], model.predict(X[test_idx]))
+
+    return {
+        'strategy': strategy,
+        'seed': seed,
+        'train_n': len(train_idx),
+        'test_n': len(test_idx),
+        'train_r2': float(train_r2),
+        'test_r2': float(test_r2),
+    }
+
+
+# ============================================================
+# AUDIT
+# ============================================================
+def run_leakage_audit(df, target_col=TARGET_COL, strategies=STRATEGIES, n_seeds=N_SEEDS,
+                      n_jobs=-1, block_km=SPATIAL_BLOCK_KM):
+    """Fit every (strategy, seed) pair in parallel and return per-run results and a summary.
+
+    The random strategy is always evaluated, because it is the baseline the optimism
+    gaps are measured against.
+    """
+    strategies = ['random'] + [s for s in strategies if s != 'random']
+    drop_cols = [col for col in IDENTIFIER_COLS + [target_col] if col in df.columns]
+    X = np.ascontiguousarray(df.drop(columns=drop_cols).to_numpy(dtype=np.float32))
+    y = df[target_col].to_numpy(dtype=np.float32)
+    split_groups = build_split_groups(df, strategies, block_km)
+
+    tasks = [(strategy, seed) for seed in range(n_seeds) for strategy in strategies]
+    n_cpus = os.cpu_count() or 1
+    n_workers = min(len(tasks), n_cpus if n_jobs in (None, -1) else n_jobs)
+    n_threads = max(1, n_cpus // n_workers)
+
+    print('=' * 70)
+    print('LEAKAGE AUDIT')
+    print('=' * 70)
+    print(f"Rows: {X.shape[0]:,} | Features: {X.shape[1]} | Target: {target_col}")
+    print(f"Strategies: {strategies}")
+    print(f"Seeds per strategy: {n_seeds} | Workers: {n_workers} x {n_threads} threads")
+
+    start = time.perf_counter()
+    results = Parallel(n_jobs=n_workers, mmap_mode='r')(
+        delayed(fit_split)(X, y, split_groups, strategy, seed, n_threads)
+        for strategy, seed in tasks
+    )
+    elapsed = time.perf_counter() - start
+
+    results_df = pd.DataFrame(results)
+    baseline = results_df.loc[results_df['strategy'] == 'random', ['seed', 'test_r2']]
+    baseline = baseline.rename(columns={'test_r2': 'random_test_r2'})
+    results_df = results_df.merge(baseline, on='seed', how='left')
+    results_df['optimism_gap'] = results_df['random_test_r2'] - results_df['test_r2']
+    results_df['train_test_gap'] = results_df['train_r2'] - results_df['test_r2']
+
+    summary_df = (
+        results_df.groupby('strategy', sort=False)
+        .agg(
+            test_r2_mean=('test_r2', 'mean'),
+            test_r2_std=('test_r2', 'std'),
+            optimism_gap_mean=('optimism_gap', 'mean'),
+            optimism_gap_std=('optimism_gap', 'std'),
+            optimism_gap_min=('optimism_gap', 'min'),
+            optimism_gap_max=('optimism_gap', 'max'),
+            train_test_gap_mean=('train_test_gap', 'mean'),
+        )
+        .reset_index()
+    )
+    print(f"\nCompleted {len(tasks)} fits in {elapsed:.1f} s")
+    return results_df, summary_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel split-strategy leakage audit.')
+    parser.add_argument('--data', type=Path, default=DATA_PATH)
+    parser.add_argument('--target', default=TARGET_COL)
+    parser.add_argument('--strategies', nargs='+', choices=STRATEGIES, default=STRATEGIES)
+    parser.add_argument('--seeds', type=int, default=N_SEEDS)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--block-km', type=float, default=SPATIAL_BLOCK_KM)
+    parser.add_argument('--output-dir', type=Path, default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    print("Loading data...")
+    df = pd.read_csv(args.data)
+    results_df, summary_df = run_leakage_audit(
+        df,
+        target_col=args.target,
+        strategies=args.strategies,
+        n_seeds=args.seeds,
+        n_jobs=args.n_jobs,
+        block_km=args.block_km,
+    )
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    results_df.to_csv(args.output_dir / 'leakage_audit_runs.csv', index=False)
+    summary_df.to_csv(args.output_dir / 'leakage_audit_summary.csv', index=False)
+
+    print('\n' + '=' * 70)
+    print('OPTIMISM GAP (random-split test R² minus strategy test R²)')
+    print('=' * 70)
+    for _, row in summary_df.iterrows():
+        print(f"{row['strategy']:<16} test R² = {row['test_r2_mean']:.4f} ± {row['test_r2_std']:.4f} | "
+              f"gap = {row['optimism_gap_mean']:.4f} "
+              f"[{row['optimism_gap_min']:.4f}, {row['optimism_gap_max']:.4f}]")
+
+    leaky = summary_df.loc[
+        (summary_df['strategy'] != 'random') & (summary_df['optimism_gap_mean'] > GAP_THRESHOLD),
+        'strategy'
+    ].tolist()
+    print()
+    if leaky:
+        print(f"VERDICT: Significant leakage detected under {leaky}. A random split is unsafe for this model.")
+    else:
+        print("VERDICT: Result is robust! No strategy loses more than "
+              f"{GAP_THRESHOLD} R² relative to a random split.")
+    print(f"Results saved to {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""
+Out-of-core XGBoost training for panels that do not fit in memory several times
+over (e.g. census tracts x years with lagged exposures).
+
+Parquet or CSV partitions are streamed batch by batch through an xgboost.DataIter
+straight into a QuantileDMatrix (or an external-memory matrix cached on disk), so
+the full frame is never materialized in pandas. Feature/target conventions match
+prepare_xy in the modeling notebooks: identifier columns, the unit column (e.g.
+GEOID) and the target are dropped, everything else is a feature. Only the unit
+column is read in full, to build GroupKFold folds by unit exactly as the
+notebooks do.
+
+Usage (from the repository root):
+    python scripts/train_external_memory.py --data data_cleaned/tract_panel/ --unit-col GEOID
+    python scripts/train_external_memory.py --mode external --compare-in-memory
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import resource
+import sys
+import time
+import traceback
+from pathlib import Path
+from queue import Empty
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import r2_score
+from sklearn.model_selection import GroupKFold
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+DATA_PATH = Path('data_cleaned/combined_final/final_combined_all_variables_reduced.csv')
+PARAMS_PATH = Path('data_cleaned/outputs_cleaned/modeling/xgboost/revision/model_b_best_params.json')
+CACHE_DIR = Path('data_cleaned/cache/xgb_external_memory')
+
+TARGET_COL = 'Mean Life Expectancy'
+IDENTIFIER_COLS = ['County', 'State', 'Year', 'Fips']
+UNIT_COL = 'Fips'
+BATCH_SIZE = 50_000
+N_SPLITS = 5
+MAX_BIN = 256
+
+
+# ============================================================
+# PARTITION STREAMING
+# ============================================================
+def list_partitions(data_path):
+    data_path = Path(data_path)
+    if data_path.is_file():
+        return [data_path]
+    partitions = sorted(data_path.glob('**/*.parquet')) or sorted(data_path.glob('**/*.csv'))
+    if not partitions:
+        raise FileNotFoundError(f"No Parquet or CSV partitions found under {data_path}")
+    return partitions
+
+
+def read_columns(partition):
+    if partition.suffix == '.parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(partition).schema_arrow.names
+    return pd.read_csv(partition, nrows=0).columns.tolist()
+
+
+def iter_batches(partitions, columns, batch_size=BATCH_SIZE):
+    """Yield DataFrames of at most batch_size rows, reading only the requested columns."""
+    for partition in partitions:
+        if partition.suffix == '.parquet':
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(partition).iter_batches(batch_size=batch_size, columns=columns):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(partition, usecols=columns, chunksize=batch_size)
+
+
+def feature_columns(partitions, target_col=TARGET_COL, unit_col=UNIT_COL, extra_drop=None):
+    drop_cols = set(IDENTIFIER_COLS + [target_col, unit_col] + list(extra_drop or []))
+    return [col for col in read_columns(partitions[0]) if col not in drop_cols]
+
+
+def read_units(partitions, unit_col=UNIT_COL, batch_size=BATCH_SIZE):
+    units = np.concatenate([batch[unit_col].to_numpy() for batch in iter_batches(partitions, [unit_col], batch_size)])
+    return pd.factorize(units)[0].astype(np.int32)
+
+
+class PanelIter(xgb.DataIter):
+    """Streams partitions as float32 batches, optionally keeping only rows where row_mask is True."""
+
+    def __init__(self, partitions, features, target_col=TARGET_COL, row_mask=None,
+                 batch_size=BATCH_SIZE, cache_prefix=None):
+        self.partitions = partitions
+        self.features = features
+        self.target_col = target_col
+        self.row_mask = row_mask
+        self.batch_size = batch_size
+        self._batches = None
+        self._offset = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self):
+        self._batches = iter_batches(self.partitions, self.features + [self.target_col], self.batch_size)
+        self._offset = 0
+
+    def next(self, input_data):
+        if self._batches is None:
+            self.reset()
+        for batch in self._batches:
+            start = self._offset
+            self._offset += len(batch)
+            if self.row_mask is not None:
+                batch = batch[self.row_mask[start:self._offset]]
+            if len(batch) == 0:
+                continue
+            input_data(
+                data=np.ascontiguousarray(batch[self.features].to_numpy(dtype=np.float32)),
+                label=batch[self.target_col].to_numpy(dtype=np.float32),
+            )
+            return True
+        return False
+
+
+def build_matrix(partitions, features, target_col, row_mask=None, mode='quantile',
+                 ref=None, batch_size=BATCH_SIZE, cache_prefix=None):
+    if mode == 'quantile':
+        data_iter = PanelIter(partitions, features, target_col, row_mask, batch_size)
+        return xgb.QuantileDMatrix(data_iter, ref=ref, max_bin=MAX_BIN)
+
+    Path(cache_prefix).parent.mkdir(parents=True, exist_ok=True)
+    data_iter = PanelIter(partitions, features, target_col, row_mask, batch_size, cache_prefix=str(cache_prefix))
+    if hasattr(xgb, 'ExtMemQuantileDMatrix'):
+        return xgb.ExtMemQuantileDMatrix(data_iter, ref=ref, max_bin=MAX_BIN)
+    return xgb.DMatrix(data_iter)
+
+
+def load_booster_params(params_path=PARAMS_PATH):
+    with open(params_path, encoding='utf-8') as f:
+        params = json.load(f)
+    num_boost_round = int(params.pop('n_estimators', 100))
+    params.update({'objective': 'reg:squarederror', 'tree_method': 'hist', 'seed': 42, 'max_bin': MAX_BIN})
+    return params, num_boost_round
+
+
+# ============================================================
+# TRAINING PATHS
+# ============================================================
+def train_out_of_core(data_path, target_col=TARGET_COL, unit_col=UNIT_COL, params_path=PARAMS_PATH,
+                      n_splits=N_SPLITS, mode='quantile', batch_size=BATCH_SIZE, extra_drop=None):
+    partitions = list_partitions(data_path)
+    features = feature_columns(partitions, target_col, unit_col, extra_drop)
+    params, num_boost_round = load_booster_params(params_path)
+    units = read_units(partitions, unit_col, batch_size)
+
+    print(f"Partitions: {len(partitions)} | Rows: {len(units):,} | Features: {len(features)} | Mode: {mode}")
+
+    fold_scores = []
+    splitter = GroupKFold(n_splits=n_splits)
+    for fold, (_, val_idx) in enumerate(splitter.split(np.zeros(len(units)), groups=units), start=1):
+        val_mask = np.zeros(len(units), dtype=bool)
+        val_mask[val_idx] = True
+        cache_prefix = CACHE_DIR / f'fold{fold}'
+
+        dtrain = build_matrix(partitions, features, target_col, ~val_mask, mode,
+                              batch_size=batch_size, cache_prefix=f'{cache_prefix}_train')
+        dval = build_matrix(partitions, features, target_col, val_mask, mode, ref=dtrain,
+                            batch_size=batch_size, cache_prefix=f'{cache_prefix}_val')
+        booster = xgb.train(params, dtrain, num_boost_round=num_boost_round)
+        fold_r2 = r2_score(dval.get_label(), booster.predict(dval))
+        fold_scores.append(fold_r2)
+        print(f"  Fold {fold}: R² = {fold_r2:.4f}")
+        del dtrain, dval, booster
+
+    return fold_scores
+
+
+def train_in_memory(data_path, target_col=TARGET_COL, unit_col=UNIT_COL, params_path=PARAMS_PATH,
+                    n_splits=N_SPLITS, extra_drop=None):
+    """Reference path mirroring the notebooks: full pandas frame, prepare_xy, .iloc copies."""
+    df = pd.concat([pd.read_csv(p) if p.suffix == '.csv' else pd.read_parquet(p)
+                    for p in list_partitions(data_path)], ignore_index=True)
+    drop_cols = [col for col in dict.fromkeys(IDENTIFIER_COLS + [target_col, unit_col] + list(extra_drop or []))
+                 if col in df.columns]
+    X = df.drop(columns=drop_cols)
+    y = df[target_col]
+    groups = df[unit_col]
+    params, num_boost_round = load_booster_params(params_path)
+
+    fold_scores = []
+    for fold, (train_idx, val_idx) in enumerate(GroupKFold(n_splits=n_splits).split(X, y, groups), start=1):
+        X_train, X_val = X.iloc[train_idx].copy(), X.iloc[val_idx].copy()
+        y_train, y_val = y.iloc[train_idx].copy(), y.iloc[val_idx].copy()
+        booster = xgb.train(params, xgb.DMatrix(X_train, label=y_train), num_boost_round=num_boost_round)
+        fold_r2 = r2_score(y_val, booster.predict(xgb.DMatrix(X_val)))
+        fold_scores.append(fold_r2)
+        print(f"  Fold {fold}: R² = {fold_r2:.4f}")
+
+    return fold_scores
+
+
+# ============================================================
+# PEAK MEMORY
+# ============================================================
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _measure(train_fn, kwargs, queue):
+    start = time.perf_counter()
+    try:
+        fold_scores = train_fn(**kwargs)
+    except Exception:
+        queue.put({'error': traceback.format_exc()})
+        return
+    queue.put({
+        'mean_r2': float(np.mean(fold_scores)),
+        'seconds': time.perf_counter() - start,
+        'peak_rss_mb': peak_rss_mb(),
+    })
+
+
+def measure_in_subprocess(train_fn, **kwargs):
+    """Run a training path in a fresh process so its peak RSS is not shared with the other path."""
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_measure, args=(train_fn, kwargs, queue))
+    process.start()
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1)
+        except Empty:
+            if not process.is_alive():
+                # The child may have exited right after putting its result
+                try:
+                    result = queue.get(timeout=1)
+                except Empty:
+                    result = {'error': f'Process exited with code {process.exitcode} without reporting a result'}
+    process.join()
+    if 'error' in result:
+        raise RuntimeError(f"{train_fn.__name__} failed:\n{result['error']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Out-of-core GroupKFold training with XGBoost.')
+    parser.add_argument('--data', type=Path, default=DATA_PATH, help='CSV/Parquet file or directory of partitions')
+    parser.add_argument('--target', default=TARGET_COL)
+    parser.add_argument('--unit-col', default=UNIT_COL)
+    parser.add_argument('--params', type=Path, default=PARAMS_PATH)
+    parser.add_argument('--n-splits', type=int, default=N_SPLITS)
+    parser.add_argument('--mode', choices=['quantile', 'external'], default='quantile')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--compare-in-memory', action='store_true',
+                        help='Also run the in-memory pandas path and compare peak memory')
+    args = parser.parse_args()
+
+    common = dict(data_path=args.data, target_col=args.target, unit_col=args.unit_col,
+                  params_path=args.params, n_splits=args.n_splits)
+
+    print('=' * 70)
+    print('OUT-OF-CORE TRAINING')
+    print('=' * 70)
+    try:
+        out_of_core = measure_in_subprocess(train_out_of_core, mode=args.mode, batch_size=args.batch_size, **common)
+        results = {'out_of_core': out_of_core}
+
+        if args.compare_in_memory:
+            print('\n' + '=' * 70)
+            print('IN-MEMORY TRAINING (reference)')
+            print('=' * 70)
+            results['in_memory'] = measure_in_subprocess(train_in_memory, **common)
+    except RuntimeError as error:
+        sys.exit(str(error))
+
+    print('\n' + '=' * 70)
+    print('SUMMARY')
+    print('=' * 70)
+    for name, result in results.items():
+        print(f"{name:<12} CV R² = {result['mean_r2']:.4f} | time = {result['seconds']:.1f} s | "
+              f"peak RSS = {result['peak_rss_mb']:,.0f} MB")
+    if 'in_memory' in results:
+        ratio = results['in_memory']['peak_rss_mb'] / results['out_of_core']['peak_rss_mb']
+        print(f"Peak memory reduction: {ratio:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+"""
+Cached, parallel figure pipeline for the paper's modeling figures.
+
+Each figure is registered with a module-level render function, its input data
+and a style spec. The pipeline fingerprints (renderer code with the helpers and
+constants it uses, data, style) and skips figures whose fingerprint matches the
+manifest from the last run and whose files still exist; the remaining figures
+are rendered in a process pool. Figures with more than DENSE_POINTS points in
+total draw every point layer rasterized (or as translucent hexbins) so axis text
+and labels stay vector in PDF output and the ~24k-point panels no longer
+dominate render time.
+
+Notebook usage (run from notebooks_clean/):
+    import sys
+    sys.path.append('..')
+    from src.figures import FigurePipeline, render_scatter_performance, render_residual_diagnostics
+
+    figures = FigurePipeline(OUTPUT_DIR)
+    figures.add('model_b_scatter_performance', render_scatter_performance,
+                y_train=y_train_model_b, train_predictions=train_predictions_model_b,
+                y_test=y_test_model_b, test_predictions=test_predictions_model_b,
+                metrics=metrics_model_b, title='Model Performance: Predictions vs. Actual')
+    figures.run()
+"""
+
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# MDPI-style figure specifications (matching Run4 / notebook 12)
+FIGURE_STYLE = {
+    'single_col_width': 3.27,
+    'double_col_width': 6.85,
+    'dpi': 600,
+    'font_size': 11,
+    'font_family': 'Arial',
+    'formats': ['png'],
+    'density': 'raster',  # 'raster', 'hexbin' or None for plain scatters
+}
+DENSE_POINTS = 5000
+HEXBIN_ALPHA = 0.6
+MANIFEST_NAME = 'figure_manifest.json'
+
+
+# ============================================================
+# FINGERPRINTS
+# ============================================================
+def _update_digest(digest, value):
+    if isinstance(value, pd.DataFrame):
+        digest.update(json.dumps([str(col) for col in value.columns]).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(str((value.dtype, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value):
+            digest.update(str(key).encode())
+            _update_digest(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _update_digest(digest, item)
+    else:
+        digest.update(repr(value).encode())
+
+
+def _referenced_names(code):
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):  # comprehensions and nested functions
+            names.extend(_referenced_names(const))
+    return names
+
+
+def _code_source(func, seen=None):
+    """Source of func plus the same-module helpers and constants it refers to, recursively.
+
+    Editing one renderer therefore only invalidates that renderer's figures, while
+    edits to a helper it calls (density_scatter, is_dense) or to a constant it
+    reads (DENSE_POINTS) invalidate every figure that depends on them.
+    """
+    seen = set() if seen is None else seen
+    if func in seen:
+        return ''
+    seen.add(func)
+    try:
+        parts = [inspect.getsource(func)]
+    except (OSError, TypeError):
+        parts = [f'{func.__module__}.{func.__qualname__}']
+    for name in dict.fromkeys(_referenced_names(func.__code__)):
+        value = func.__globals__.get(name)
+        if inspect.isfunction(value) and value.__module__ == func.__module__:
+            parts.append(_code_source(value, seen))
+        elif isinstance(value, (bool, int, float, str)):
+            parts.append(f'{name} = {value!r}')
+    return '\n'.join(parts)
+
+
+def figure_fingerprint(renderer, data, style):
+    digest = hashlib.sha256()
+    digest.update(_code_source(renderer).encode())
+    digest.update(_code_source(_render_figure).encode())
+    _update_digest(digest, data)
+    _update_digest(digest, style)
+    return digest.hexdigest()[:16]
+
+
+# ============================================================
+# DRAWING HELPERS
+# ============================================================
+def is_dense(style, n_points):
+    """One density decision per figure, from the total number of points it draws."""
+    return style.get('density') is not None and n_points > DENSE_POINTS
+
+
+def density_scatter(ax, x, y, style, color, dense, label=None, s=15, alpha=0.5, cmap='Blues',
+                    extent=None, **kwargs):
+    """Scatter layer drawn rasterized, or as a translucent hexbin, when the figure is dense.
+
+    Every layer of a figure gets the same `dense` flag so one layer never paints an
+    opaque scatter over another drawn as a density. Hexbin layers share `extent`
+    so their cells line up, and get a marker in the layer colour as legend entry.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if dense and style['density'] == 'hexbin':
+        ax.hexbin(x, y, gridsize=80, mincnt=1, bins='log', cmap=cmap, linewidths=0,
+                  alpha=HEXBIN_ALPHA, extent=extent)
+        return ax.scatter([], [], color=color, marker='h', s=s * 2, label=label)
+    return ax.scatter(x, y, color=color, s=s, alpha=alpha, label=label, rasterized=dense, **kwargs)
+
+
+# ============================================================
+# RENDERERS (one per figure type; return the matplotlib Figure)
+# ============================================================
+def render_scatter_performance(style, y_train, train_predictions, y_test, test_predictions, metrics, title):
+    import matplotlib.pyplot as plt
+
+    dense = is_dense(style, len(y_train) + len(y_test))
+    all_targets = np.concatenate((np.asarray(y_train), np.asarray(y_test)))
+    all_predictions = np.concatenate((np.asarray(train_predictions), np.asarray(test_predictions)))
+    extent = (np.min(all_targets), np.max(all_targets), np.min(all_predictions), np.max(all_predictions))
+
+    fig, ax = plt.subplots(figsize=(style['double_col_width'], style['double_col_width'] * 0.7))
+    density_scatter(ax, y_train, train_predictions, style, color='royalblue', dense=dense, cmap='Blues',
+                    extent=extent,
+                    label=f"Train $R^2$={metrics['train_r2']:.2f}, RMSE={metrics['train_rmse']:.2f}, "
+                          f"N={len(y_train):,}")
+    density_scatter(ax, y_test, test_predictions, style, color='darkorange', dense=dense, cmap='Oranges',
+                    extent=extent,
+                    label=f"Test $R^2$={metrics['test_r2']:.2f}, RMSE={metrics['test_rmse']:.2f}, "
+                          f"N={len(y_test):,}")
+    lower, upper = np.min(all_targets), np.max(all_targets)
+    ax.plot([lower, upper], [lower, upper], linestyle='--', color='black', linewidth=1, label='1:1 line')
+    ax.set_xlabel('True Life Expectancy (years)', fontsize=style['font_size'])
+    ax.set_ylabel('Predicted Life Expectancy (years)', fontsize=style['font_size'])
+    ax.set_title(title, fontsize=style['font_size'], fontweight='bold')
+    ax.legend(fontsize=10, frameon=True, loc='lower right')
+    ax.grid(axis='both', linewidth=0.15, alpha=0.3)
+    fig.tight_layout()
+    return fig
+
+
+def render_qq_comparison(style, y_train, train_predictions, y_test, test_predictions, title):
+    import matplotlib.pyplot as plt
+
+    all_predictions = np.concatenate((np.asarray(train_predictions), np.asarray(test_predictions)))
+    all_targets = np.concatenate((np.asarray(y_train), np.asarray(y_test)))
+    dense = is_dense(style, len(all_targets))
+
+    fig, ax = plt.subplots(figsize=(style['double_col_width'], style['double_col_width'] * 0.7))
+    ax.plot(np.sort(y_train), np.sort(train_predictions), 'x', label='Train', alpha=0.5,
+            color='royalblue', markersize=3, rasterized=dense)
+    ax.plot(np.sort(y_test), np.sort(test_predictions), 'o', label='Test', alpha=0.5,
+            color='darkorange', markersize=3, rasterized=dense)
+
+    lower = min(np.min(all_targets), np.min(all_predictions))
+    upper = max(np.max(all_targets), np.max(all_predictions))
+    ax.plot([lower, upper], [lower, upper], 'r', linewidth=1, label='Perfect agreement')
+
+    for percentile, color, label in [(25, 'orange', '25th'), (50, 'violet', '50th'),
+                                     (75, 'cyan', '75th'), (90, 'green', '90th')]:
+        ax.plot(np.percentile(all_targets, percentile), np.percentile(all_predictions, percentile),
+                marker='D', markersize=4, color=color, linestyle='None', label=f'{label} percentile')
+
+    ax.set_title(title, fontsize=style['font_size'], fontweight='bold')
+    ax.set_xlabel('True Life Expectancy (years)', fontsize=style['font_size'])
+    ax.set_ylabel('Predicted Life Expectancy (years)', fontsize=style['font_size'])
+    ax.grid(axis='both', linewidth=0.15, alpha=0.3)
+    ax.legend(fontsize=8, frameon=True, loc='lower right')
+    fig.tight_layout()
+    return fig
+
+
+def render_residual_diagnostics(style, predicted, residuals, poverty_rate, title):
+    import matplotlib.pyplot as plt
+
+    font_size = style['font_size']
+    dense = is_dense(style, len(residuals))
+    fig, axes = plt.subplots(1, 3, figsize=(style['double_col_width'], 2.65))
+
+    for ax, x, xlabel, panel_title in [
+        (axes[0], predicted, 'Predicted life expectancy (years)', 'Residuals vs. Fitted'),
+        (axes[1], poverty_rate, 'Poverty rate (%)', 'Residuals vs. Poverty'),
+    ]:
+        density_scatter(ax, x, residuals, style, color='#2f6f9f', dense=dense, s=9, alpha=0.28, cmap='Blues',
+                        edgecolors='none')
+        ax.axhline(0, color='black', linestyle='--', linewidth=0.8, alpha=0.7)
+        ax.set_xlabel(xlabel, fontsize=font_size - 1)
+        ax.set_ylabel('Residual (years)', fontsize=font_size)
+        ax.set_title(panel_title, fontsize=font_size, fontweight='bold')
+
+    axes[2].hist(residuals, bins=35, color='#5e9f74', edgecolor='white', linewidth=0.4, alpha=0.9)
+    axes[2].axvline(0, color='black', linestyle='--', linewidth=0.8, alpha=0.7)
+    axes[2].set_xlabel('Residual (years)', fontsize=font_size - 1)
+    axes[2].set_ylabel('Frequency', fontsize=font_size)
+    axes[2].set_title('Residual Distribution', fontsize=font_size, fontweight='bold')
+
+    for ax in axes:
+        ax.grid(alpha=0.18)
+
+    fig.suptitle(title, fontsize=font_size + 1, fontweight='bold', y=1.04)
+    fig.tight_layout()
+    return fig
+
+
+def render_shap_summary(style, shap_values, X_display, title=None, max_display=20, plot_type='dot',
+                        figsize=None):
+    import matplotlib.pyplot as plt
+    import shap
+
+    if figsize is None:
+        figsize = (style['double_col_width'], 5) if plot_type == 'dot' else (style['single_col_width'], 4)
+    fig = plt.figure(figsize=figsize)
+    shap.summary_plot(shap_values, X_display, max_display=max_display, plot_type=plot_type, show=False)
+    if plot_type == 'dot' and is_dense(style, len(X_display)):
+        for collection in fig.axes[0].collections:
+            collection.set_rasterized(True)
+    if title is not None:
+        plt.title(title, fontsize=style['font_size'], fontweight='bold', pad=10)
+    xlabel = 'SHAP Value (Impact on Model Output)' if plot_type == 'dot' else 'Mean |SHAP Value|'
+    plt.xlabel(xlabel, fontsize=style['font_size'])
+    plt.tight_layout()
+    return plt.gcf()
+
+
+# ============================================================
+# PIPELINE
+# ============================================================
+def _render_figure(renderer, data, style, output_stem):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.rcParams['font.size'] = style['font_size']
+    plt.rcParams['font.family'] = style['font_family']
+    fig = renderer(style=style, **data)
+    paths = []
+    for fmt in style['formats']:
+        path = f'{output_stem}.{fmt}'
+        fig.savefig(path, dpi=style['dpi'], bbox_inches='tight')
+        paths.append(path)
+    plt.close(fig)
+    return paths
+
+
+class FigurePipeline:
+    """Registry of figures that are re-rendered only when their inputs or style change."""
+
+    def __init__(self, output_dir, style=None):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.style = {**FIGURE_STYLE, **(style or {})}
+        self.manifest_path = self.output_dir / MANIFEST_NAME
+        if self.manifest_path.exists():
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {}
+        self.figures = {}
+
+    def add(self, name, renderer, style=None, **data):
+        """Register a figure; `data` holds the renderer's keyword arguments (arrays, frames, titles).
+
+        The renderer must be a module-level function so worker processes can import it.
+        """
+        figure_style = {**self.style, **(style or {})}
+        data = {key: np.asarray(value) if isinstance(value, pd.Series) else value for key, value in data.items()}
+        self.figures[name] = {
+            'renderer': renderer,
+            'data': data,
+            'style': figure_style,
+            'fingerprint': figure_fingerprint(renderer, data, figure_style),
+        }
+
+    def is_current(self, name):
+        figure = self.figures[name]
+        outputs_exist = all((self.output_dir / f'{name}.{fmt}').exists() for fmt in figure['style']['formats'])
+        return outputs_exist and self.manifest.get(name) == figure['fingerprint']
+
+    def run(self, n_jobs=-1, force=False):
+        stale = [name for name in self.figures if force or not self.is_current(name)]
+        skipped = [name for name in self.figures if name not in stale]
+
+        print('=' * 70)
+        print('FIGURE PIPELINE')
+        print('=' * 70)
+        print(f'Registered: {len(self.figures)} | Unchanged (skipped): {len(skipped)} | To render: {len(stale)}')
+
+        rendered = {}
+        if stale:
+            n_workers = min(len(stale), os.cpu_count() or 1) if n_jobs in (None, -1) else min(len(stale), n_jobs)
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = {
+                    name: executor.submit(
+                        _render_figure,
+                        self.figures[name]['renderer'],
+                        self.figures[name]['data'],
+                        self.figures[name]['style'],
+                        str(self.output_dir / name),
+                    )
+                    for name in stale
+                }
+                try:
+                    for name, future in futures.items():
+                        rendered[name] = future.result()
+                        self.manifest[name] = self.figures[name]['fingerprint']
+                        print(f'  Rendered: {name}')
+                finally:
+                    with open(self.manifest_path, 'w', encoding='utf-8') as f:
+                        json.dump(self.manifest, f, indent=2)
+
+        return {'rendered': rendered, 'skipped': skipped}
@@ -0,0 +1,254 @@
+"""
+Compact feature matrix for the county-year panel.
+
+`prepare_panel` is the memory-lean counterpart of the notebooks' `prepare_xy`:
+features are held once in a C-contiguous float32 array with a column index,
+identifiers as int32 codes, and row/column subsets (train/test, folds, ablation
+feature lists, the temporal split) share that array through index arrays. A
+subset is only materialized when `.X` is read, in a single gather; contiguous
+row or column ranges come back as NumPy views with no copy at all.
+
+Arrays (`.X`, `np.asarray(panel)`, scikit-learn splits of the panel) carry no
+column names. Pass `.to_frame()` to XGBoost and SHAP wherever feature names
+matter (SHAP rankings, permutation importance, `feature_names_in_`); it wraps
+the gathered array without another copy.
+
+Notebook usage (run from notebooks_clean/):
+    import sys
+    sys.path.append('..')
+    from src.panel import prepare_panel
+
+    panel = prepare_panel(df_model_b_complete)
+    train_idx, test_idx = next(gss_model_b.split(panel, groups=panel.groups))
+    train, test = panel.subset(rows=train_idx), panel.subset(rows=test_idx)
+    bayes_model_b, best_model_b = run_bayes_xgb(train.to_frame(), train.y, train.groups, 'Model B')
+    shap_values_model_b = shap.TreeExplainer(best_model_b).shap_values(test.to_frame())
+
+    train_top20 = train.subset(columns=top20_features)
+    temporal_train = panel.subset(rows=panel.where(Year=range(2012, 2017)))
+"""
+
+import numpy as np
+import pandas as pd
+
+TARGET_COL = 'Mean Life Expectancy'
+IDENTIFIER_COLS = ['County', 'State', 'Year', 'Fips']
+UNIT_COL = 'Fips'
+
+
+def _as_slice(idx):
+    """Turn a sorted, gap-free index array into a slice so indexing returns a view."""
+    if isinstance(idx, slice) or len(idx) == 0:
+        return idx
+    start, stop = int(idx[0]), int(idx[-1]) + 1
+    if stop - start == len(idx) and np.array_equal(idx, np.arange(start, stop)):
+        return slice(start, stop)
+    return idx
+
+
+def _compose(outer, inner, size):
+    """Index into `outer` (None, slice or index array over `size` items) with `inner`."""
+    if inner is None:
+        return outer
+    inner = np.atleast_1d(inner)
+    if inner.dtype == bool:
+        inner = np.flatnonzero(inner)
+    if outer is None:
+        return _as_slice(inner.astype(np.intp))
+    base = np.arange(size)[outer] if isinstance(outer, slice) else outer
+    return _as_slice(base[inner])
+
+
+class CompactPanel:
+    """Float32 feature matrix, float32 target and int32 identifier codes with view-based subsets.
+
+    Subsets created with `subset` share the parent's arrays; `X`, `y`, `groups` and
+    `ids` gather the selected rows/columns on access.
+    """
+
+    def __init__(self, X, y, feature_names, ids, id_categories, unit_col=UNIT_COL, rows=None, columns=None):
+        self._X = X
+        self._y = y
+        self._ids = ids
+        self.id_categories = id_categories
+        self.all_feature_names = pd.Index(feature_names)
+        self.unit_col = unit_col
+        self._rows = rows
+        self._columns = columns
+        self._X_cache = None
+
+    # Shape -----------------------------------------------------------
+    @property
+    def shape(self):
+        n_rows = len(range(self._X.shape[0])[self._rows]) if isinstance(self._rows, slice) else (
+            self._X.shape[0] if self._rows is None else len(self._rows))
+        return n_rows, len(self.feature_names)
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def feature_names(self):
+        if self._columns is None:
+            return self.all_feature_names
+        return self.all_feature_names[self._columns]
+
+    @property
+    def columns(self):
+        return self.feature_names
+
+    # Data access -----------------------------------------------------
+    def _take_rows(self, array):
+        if self._rows is None or isinstance(self._rows, slice):
+            return array if self._rows is None else array[self._rows]
+        return array.take(self._rows, axis=0)
+
+    @property
+    def X(self):
+        """Selected rows/columns, gathered on first access and cached on this subset."""
+        if self._X_cache is None:
+            self._X_cache = self._gather()
+        return self._X_cache
+
+    def _gather(self):
+        if isinstance(self._rows, np.ndarray) and isinstance(self._columns, np.ndarray):
+            return self._X[np.ix_(self._rows, self._columns)]
+        X = self._take_rows(self._X)
+        if self._columns is None:
+            return X
+        if isinstance(self._columns, slice):
+            return X[:, self._columns]
+        return np.ascontiguousarray(X.take(self._columns, axis=1))
+
+    @property
+    def y(self):
+        return self._take_rows(self._y)
+
+    @property
+    def groups(self):
+        return self._take_rows(self._ids[self.unit_col])
+
+    @property
+    def ids(self):
+        return {name: self._take_rows(codes) for name, codes in self._ids.items()}
+
+    def __array__(self, dtype=None, copy=None):
+        """NumPy protocol; without copy=True the result may share memory with the panel."""
+        X = self.X
+        if dtype is not None and np.dtype(dtype) != X.dtype:
+            if copy is False:
+                raise ValueError(f"Cannot convert the float32 panel to {np.dtype(dtype)} without a copy")
+            return X.astype(dtype)
+        return X.copy() if copy else X
+
+    # Subsets ---------------------------------------------------------
+    def column_index(self, names):
+        indexer = self.all_feature_names.get_indexer(list(names))
+        if (indexer < 0).any():
+            missing = [name for name, pos in zip(names, indexer) if pos < 0]
+            raise KeyError(f"Features not in panel: {missing}")
+        return indexer.astype(np.intp)
+
+    def subset(self, rows=None, columns=None):
+        """Rows are positions, a slice or a boolean mask relative to this panel; columns are feature names."""
+        if isinstance(rows, slice):
+            rows = np.arange(len(self))[rows]
+        new_rows = _compose(self._rows, rows, self._X.shape[0])
+        if columns is None:
+            new_columns = self._columns
+        else:
+            new_columns = _as_slice(self.column_index(columns))
+        return CompactPanel(self._X, self._y, self.all_feature_names, self._ids, self.id_categories,
+                            self.unit_col, new_rows, new_columns)
+
+    def __getitem__(self, key):
+        """panel[rows] or panel[rows, columns]; columns are positions, and `...` or `:` keep them all.
+
+        scikit-learn's `_safe_indexing` (train_test_split, cross_val_score) calls
+        `panel[indices, ...]`, so splits come back as panels sharing this array.
+        """
+        if not isinstance(key, tuple):
+            return self.subset(rows=key)
+        if len(key) > 2 or (len(key) == 2 and key[0] is Ellipsis):
+            raise IndexError(f"CompactPanel supports [rows] or [rows, columns] keys, got {key!r}")
+        rows = key[0] if key else None
+        columns = key[1] if len(key) == 2 else Ellipsis
+        if columns is Ellipsis or (isinstance(columns, slice) and columns == slice(None)):
+            return self.subset(rows=rows)
+        return self.subset(rows=rows, columns=np.atleast_1d(self.feature_names[columns]))
+
+    def drop_columns(self, names):
+        names = set(names)
+        return self.subset(columns=[name for name in self.feature_names if name not in names])
+
+    def where(self, **id_values):
+        """Row positions (relative to this panel) whose identifiers match, e.g. where(Year=[2017, 2018])."""
+        mask = np.ones(len(self), dtype=bool)
+        ids = self.ids
+        for name, values in id_values.items():
+            values = np.atleast_1d(np.asarray(list(values) if isinstance(values, range) else values))
+            if name in self.id_categories:
+                values = self.id_categories[name].get_indexer(values)
+            mask &= np.isin(ids[name], values)
+        return np.flatnonzero(mask)
+
+    # Interop ---------------------------------------------------------
+    def to_frame(self):
+        """Feature DataFrame (e.g. for SHAP plots); wraps the gathered array without another copy."""
+        return pd.DataFrame(self.X, columns=self.feature_names, copy=False)
+
+    def id_frame(self):
+        """Decoded identifier columns for prediction tables."""
+        frame = {}
+        for name, codes in self.ids.items():
+            frame[name] = self.id_categories[name].take(codes) if name in self.id_categories else codes
+        return pd.DataFrame(frame)
+
+    def dmatrix(self, quantile=True, ref=None, **kwargs):
+        import xgboost as xgb
+
+        names = [str(name) for name in self.feature_names]
+        if quantile:
+            return xgb.QuantileDMatrix(self.X, label=self.y, feature_names=names, ref=ref, **kwargs)
+        return xgb.DMatrix(self.X, label=self.y, feature_names=names, **kwargs)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the shared arrays (subsets add nothing until materialized)."""
+        return self._X.nbytes + self._y.nbytes + sum(codes.nbytes for codes in self._ids.values())
+
+
+def prepare_panel(df, target_col=TARGET_COL, extra_drop=None, identifier_cols=IDENTIFIER_COLS, unit_col=UNIT_COL):
+    """Compact equivalent of prepare_xy: same feature/target/group conventions, float32/int32 storage."""
+    drop_cols = list(identifier_cols) + [target_col]
+    if extra_drop is not None:
+        drop_cols = drop_cols + list(extra_drop)
+    feature_names = [col for col in df.columns if col not in drop_cols]
+
+    X = np.empty((len(df), len(feature_names)), dtype=np.float32, order='C')
+    for j, col in enumerate(feature_names):
+        X[:, j] = df[col].to_numpy(dtype=np.float32)
+    y = df[target_col].to_numpy(dtype=np.float32)
+
+    ids, id_categories = {}, {}
+    for col in [col for col in identifier_cols if col in df.columns]:
+        if pd.api.types.is_integer_dtype(df[col]):
+            ids[col] = df[col].to_numpy(dtype=np.int32)
+        else:
+            codes, categories = pd.factorize(df[col])
+            ids[col] = codes.astype(np.int32)
+            id_categories[col] = categories
+
+    return CompactPanel(X, y, feature_names, ids, id_categories, unit_col)
+
+
+def memory_comparison(df, panel, target_col=TARGET_COL):
+    """Bytes of the pandas prepare_xy outputs vs. the compact panel."""
+    drop_cols = [col for col in IDENTIFIER_COLS + [target_col] if col in df.columns]
+    pandas_bytes = int(df.drop(columns=drop_cols).memory_usage(index=True, deep=True).sum()
+                       + df[target_col].memory_usage(deep=True) + df[panel.unit_col].memory_usage(deep=True))
+    return {
+        'pandas_bytes': pandas_bytes,
+        'panel_bytes': int(panel.nbytes),
+        'reduction': pandas_bytes / panel.nbytes,
+    }
@@ -0,0 +1,332 @@
+"""
+Cross-run warm-start store for BayesSearchCV.
+
+Every search (Model B, the Top 20/10/5 ablations, runs 1-5, the CVD notebook)
+is recorded with its feature set, target and a hash of the training data. A new
+search asks the store for the most relevant previous evaluations and tells them
+to the Gaussian-process optimizer before its first iteration, so it starts in the
+region earlier searches already mapped instead of from random points.
+
+Notebook usage (run from notebooks_clean/):
+    import sys
+    sys.path.append('..')
+    from src.search_history import SearchHistoryStore, run_warm_bayes_xgb
+
+    store = SearchHistoryStore(OUTPUT_DIR.parent / 'search_history')
+    store.import_run('model_b', OUTPUT_DIR / 'model_b_cv_results.csv',
+                     features=X_train_model_b.columns, target=TARGET_COL)
+    bayes_top20, best_model_top20, report = run_warm_bayes_xgb(
+        X_train_top20, y_train_model_b, groups_train_model_b,
+        section_name='Top 20 model', store=store, run_id='ablation_top_20',
+        target=TARGET_COL, n_iter=20)
+
+Previous evaluations on identical training data (same data hash) are told to the
+optimizer as observations. Evaluations from other feature sets, targets or data
+are on a different R² scale, so they are only used as the first points to
+evaluate, replacing the optimizer's random initial points.
+"""
+
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.model_selection import GroupKFold
+from skopt import BayesSearchCV, Optimizer
+from skopt.space import Integer, Real
+from skopt.utils import dimensions_aslist
+
+# Bayesian search space (same as Run4 / notebook 12)
+SEARCH_SPACES = {
+    'n_estimators': Integer(200, 1500),
+    'max_depth': Integer(4, 8),
+    'learning_rate': Real(0.01, 0.15, prior='log-uniform'),
+    'subsample': Real(0.6, 0.95),
+    'colsample_bytree': Real(0.5, 0.9),
+    'reg_alpha': Real(0.01, 5.0, prior='log-uniform'),
+    'reg_lambda': Real(0.1, 5.0, prior='log-uniform'),
+    'min_child_weight': Integer(3, 15),
+}
+
+MIN_RELEVANCE = 0.3
+MAX_PRIOR_POINTS = 30
+CONVERGENCE_TOL = 0.002
+
+
+def data_fingerprint(X, y=None):
+    """Stable hash of column names, values and (optionally) the target."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(col) for col in X.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    if y is not None:
+        digest.update(pd.util.hash_pandas_object(pd.Series(np.asarray(y)), index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def iterations_to_reach(scores, target_score, tol=CONVERGENCE_TOL):
+    """1-based iteration at which the running best first comes within tol of target_score, or None."""
+    reached = np.maximum.accumulate(np.asarray(scores, dtype=float)) >= target_score - tol
+    return int(np.argmax(reached)) + 1 if reached.any() else None
+
+
+def convergence_iteration(scores, tol=CONVERGENCE_TOL):
+    """1-based iteration at which the running best first comes within tol of the final best."""
+    return iterations_to_reach(scores, np.max(np.asarray(scores, dtype=float)), tol)
+
+
+class SearchHistoryStore:
+    """Directory of past BayesSearchCV evaluations indexed by feature set, target and data hash.
+
+    Layout: `index.json` with one entry per run, plus `<run_id>_cv_results.csv`
+    holding the `param_*` columns and `mean_test_score` in evaluation order.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / 'index.json'
+        if self.index_path.exists():
+            with open(self.index_path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        else:
+            self.entries = {}
+
+    def _save_index(self):
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2)
+
+    def add(self, run_id, cv_results, features, target, data_hash=None):
+        cv_results = pd.DataFrame(cv_results)
+        keep_cols = [col for col in cv_results.columns if col.startswith('param_')] + ['mean_test_score']
+        cv_results = cv_results[keep_cols]
+        cv_results_path = self.root / f'{run_id}_cv_results.csv'
+        cv_results.to_csv(cv_results_path, index=False)
+
+        best_row = cv_results.loc[cv_results['mean_test_score'].idxmax()]
+        self.entries[run_id] = {
+            'target': target,
+            'features': [str(col) for col in features],
+            'data_hash': data_hash,
+            'n_iter': int(len(cv_results)),
+            'best_score': float(best_row['mean_test_score']),
+            'best_params': {col[len('param_'):]: _to_python(best_row[col])
+                            for col in keep_cols if col.startswith('param_')},
+            'convergence_iteration': convergence_iteration(cv_results['mean_test_score']),
+            'cv_results': cv_results_path.name,
+            'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self._save_index()
+        return self.entries[run_id]
+
+    def import_run(self, run_id, cv_results_path, features, target, data_hash=None):
+        """Register an existing `*_cv_results.csv` written by the notebooks."""
+        return self.add(run_id, pd.read_csv(cv_results_path), features, target, data_hash)
+
+    def relevance(self, entry, features, target, data_hash=None):
+        """Jaccard overlap of feature sets, halved across targets, with a bonus for identical data."""
+        features = set(map(str, features))
+        previous = set(entry['features'])
+        score = len(features & previous) / len(features | previous) if features | previous else 0.0
+        if entry['target'] != target:
+            score *= 0.5
+        if data_hash is not None and entry.get('data_hash') == data_hash:
+            score += 0.25
+        return score
+
+    def relevant_runs(self, features, target, data_hash=None, min_relevance=MIN_RELEVANCE, exclude=()):
+        ranked = [
+            (self.relevance(entry, features, target, data_hash), run_id)
+            for run_id, entry in self.entries.items() if run_id not in exclude
+        ]
+        return [(run_id, score) for score, run_id in sorted(ranked, reverse=True) if score >= min_relevance]
+
+    def prior_points(self, features, target, data_hash=None, max_points=MAX_PRIOR_POINTS,
+                     min_relevance=MIN_RELEVANCE, exclude=()):
+        """Best (params, score, data_hash) triples from relevant runs, most relevant run first."""
+        runs = self.relevant_runs(features, target, data_hash, min_relevance, exclude)
+        points, seen = [], set()
+        per_run = max(1, max_points // max(len(runs), 1))
+        for run_id, _ in runs:
+            cv_results = pd.read_csv(self.root / self.entries[run_id]['cv_results'])
+            param_cols = [col for col in cv_results.columns if col.startswith('param_')]
+            for _, row in cv_results.nlargest(per_run, 'mean_test_score').iterrows():
+                params = {col[len('param_'):]: _to_python(row[col]) for col in param_cols}
+                key = tuple(sorted(params.items()))
+                if key in seen:
+                    continue
+                seen.add(key)
+                points.append((params, float(row['mean_test_score']), self.entries[run_id].get('data_hash')))
+        return points[:max_points], runs
+
+
+class _SeededOptimizer(Optimizer):
+    """skopt Optimizer that proposes queued seed points before asking its surrogate."""
+
+    seed_queue = ()
+
+    def ask(self, n_points=None, strategy='cl_min'):
+        if not self.seed_queue:
+            return super().ask(n_points, strategy)
+        n = 1 if n_points is None else n_points
+        points, self.seed_queue = list(self.seed_queue[:n]), self.seed_queue[n:]
+        if n_points is None:
+            return points[0]
+        if len(points) < n:
+            points += super().ask(n - len(points), strategy)
+        return points
+
+
+class WarmStartBayesSearchCV(BayesSearchCV):
+    """BayesSearchCV seeded with previously evaluated points.
+
+    `warm_start_points` is a list of (params dict, score, data_hash) triples. Points
+    whose data_hash equals `warm_start_data_hash` were scored on this exact objective
+    and are told to the optimizer before the first iteration. The rest are evaluated
+    first, in order, in place of the random initial points (at most the optimizer's
+    n_initial_points of them). Points missing a parameter or outside the search space
+    are ignored.
+    """
+
+    def __init__(self, estimator, search_spaces, optimizer_kwargs=None, n_iter=50, scoring=None,
+                 fit_params=None, n_jobs=1, n_points=1, iid='deprecated', refit=True, cv=None,
+                 verbose=0, pre_dispatch='2*n_jobs', random_state=None, error_score='raise',
+                 return_train_score=False, warm_start_points=None, warm_start_data_hash=None):
+        self.warm_start_points = warm_start_points
+        self.warm_start_data_hash = warm_start_data_hash
+        super().__init__(
+            estimator, search_spaces, optimizer_kwargs=optimizer_kwargs, n_iter=n_iter, scoring=scoring,
+            fit_params=fit_params, n_jobs=n_jobs, n_points=n_points, iid=iid, refit=refit, cv=cv,
+            verbose=verbose, pre_dispatch=pre_dispatch, random_state=random_state,
+            error_score=error_score, return_train_score=return_train_score,
+        )
+
+    def _make_optimizer(self, params_space):
+        kwargs = self.optimizer_kwargs_.copy()
+        kwargs['dimensions'] = dimensions_aslist(params_space)
+        optimizer = _SeededOptimizer(**kwargs)
+        names = sorted(params_space.keys())
+        for dim, name in zip(optimizer.space.dimensions, names):
+            if dim.name is None:
+                dim.name = name
+
+        x0, y0, queue = [], [], []
+        for params, score, data_hash in self.warm_start_points or ():
+            if any(name not in params or pd.isna(params[name]) for name in names):
+                continue
+            point = [int(round(params[name])) if isinstance(dim, Integer) else float(params[name])
+                     for name, dim in zip(names, optimizer.space.dimensions)]
+            if point not in optimizer.space or point in x0 or point in queue:
+                continue
+            if self.warm_start_data_hash is not None and data_hash == self.warm_start_data_hash:
+                x0.append(point)
+                y0.append(-score)
+            else:
+                queue.append(point)
+        if x0:
+            optimizer.tell(x0, y0)
+        optimizer.seed_queue = queue[:optimizer.n_initial_points_]
+
+        self.n_warm_start_points_ = len(x0)
+        self.n_warm_start_evaluated_ = len(optimizer.seed_queue)
+        print(f"Warm start: told {len(x0)} evaluations on identical data, "
+              f"re-evaluating {len(optimizer.seed_queue)} points from related searches first")
+        return optimizer
+
+
+def run_warm_bayes_xgb(X_train, y_train, groups_train, section_name, store, run_id, target,
+                       n_iter=20, search_spaces=SEARCH_SPACES, max_prior_points=MAX_PRIOR_POINTS,
+                       baseline_run_id=None):
+    """Drop-in for the notebooks' run_bayes_xgb that seeds from, and records into, a SearchHistoryStore.
+
+    Returns (bayes, best_estimator, report). `iterations_saved` compares the iteration at
+    which this search came within CONVERGENCE_TOL of its own best with the same measure
+    for a reference run: `baseline_run_id` (e.g. a cold-start search on the same data)
+    if given, otherwise the most relevant seed run. Each run is measured on its own
+    score scale, so the number is defined even when the problems differ, as for the
+    Top 20/10/5 ablations seeded from Model B. When the reference ran on identical data
+    the report also gives the iteration at which this search matched its best score.
+    """
+    if baseline_run_id is not None and baseline_run_id not in store.entries:
+        raise KeyError(f"Baseline run '{baseline_run_id}' is not in the search-history store at {store.root}")
+    data_hash = data_fingerprint(X_train, y_train)
+    prior_points, runs = store.prior_points(X_train.columns, target, data_hash,
+                                            max_points=max_prior_points, exclude=(run_id,))
+
+    print('=' * 70)
+    print(f'RUNNING WARM-STARTED BAYESIAN OPTIMIZATION: {section_name}')
+    print('=' * 70)
+    print(f'Training rows: {len(X_train):,}')
+    print(f'Number of features: {X_train.shape[1]}')
+    print('Using 5-fold GroupKFold by county')
+    if runs:
+        print('Seeding from: ' + ', '.join(f'{rid} (relevance {score:.2f})' for rid, score in runs))
+    else:
+        print('No relevant previous searches found; starting from scratch.')
+
+    bayes = WarmStartBayesSearchCV(
+        estimator=xgb.XGBRegressor(objective='reg:squarederror', random_state=42, tree_method='hist'),
+        search_spaces=search_spaces,
+        n_iter=n_iter,
+        cv=GroupKFold(n_splits=5),
+        scoring='r2',
+        n_jobs=-1,
+        random_state=42,
+        refit=True,
+        verbose=1,
+        warm_start_points=prior_points,
+        warm_start_data_hash=data_hash,
+    )
+    bayes.fit(X_train, y_train, groups=groups_train)
+
+    store.add(run_id, bayes.cv_results_, X_train.columns, target, data_hash)
+    new_convergence = convergence_iteration(bayes.cv_results_['mean_test_score'])
+    report = {
+        'run_id': run_id,
+        'seed_points_told': bayes.n_warm_start_points_,
+        'seed_points_evaluated': bayes.n_warm_start_evaluated_,
+        'seed_runs': [rid for rid, _ in runs],
+        'n_iter': n_iter,
+        'convergence_iteration': new_convergence,
+        'best_score': float(bayes.best_score_),
+    }
+    reference_id = baseline_run_id if baseline_run_id is not None else (runs[0][0] if runs else None)
+    if reference_id is not None:
+        reference = store.entries[reference_id]
+        report.update({
+            'reference_run': reference_id,
+            'reference_n_iter': reference['n_iter'],
+            'reference_convergence_iteration': reference['convergence_iteration'],
+            'iterations_saved': reference['convergence_iteration'] - new_convergence,
+        })
+        if reference.get('data_hash') == data_hash:
+            report['reference_best_score'] = reference['best_score']
+            report['iterations_to_reference_best'] = iterations_to_reach(
+                bayes.cv_results_['mean_test_score'], reference['best_score'])
+
+    print('\nOptimization complete.')
+    print(f'Best CV R²: {bayes.best_score_:.4f}')
+    print(f'Converged at iteration {new_convergence} of {n_iter}')
+    if reference_id is not None:
+        print(f"Reference run '{reference_id}' converged at iteration {report['reference_convergence_iteration']} "
+              f"of {report['reference_n_iter']}: {report['iterations_saved']} iterations saved")
+        if 'reference_best_score' in report:
+            reached = report['iterations_to_reference_best']
+            if reached is not None:
+                outcome = f'reached at iteration {reached}'
+            else:
+                outcome = f'not reached in {n_iter} iterations'
+            print(f"Reference best CV R² {report['reference_best_score']:.4f} (same data) {outcome}")
+    print('Best parameters:')
+    for key, value in bayes.best_params_.items():
+        print(f'  - {key}: {value}')
+
+    return bayes, bayes.best_estimator_, report
+
+
+def _to_python(value):
+    if isinstance(value, (np.integer, np.floating)):
+        return value.item()
+    return value
@@ -0,0 +1,119 @@
+"""
+Crawler and offline index for scripts/discover_cdc_datasets.py, run against a
+local http.server stand-in for the Socrata catalog API.
+"""
+
+import asyncio
+import importlib.util
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+SCRIPT_PATH = Path(__file__).resolve().parents[1] / 'scripts' / 'discover_cdc_datasets.py'
+spec = importlib.util.spec_from_file_location('discover_cdc_datasets', SCRIPT_PATH)
+discover = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(discover)
+
+N_RESULTS = 250
+PAGE_SIZE = 100
+THROTTLED_OFFSET = 100
+DROPPED_OFFSET = 200  # connection closed without a response (RemoteDisconnected)
+TRUNCATED_OFFSET = 0  # body shorter than Content-Length (IncompleteRead), 'smoking' only
+
+
+def catalog_item(keyword, i):
+    name = f'COVID-19 county case surveillance {i}' if i % 5 == 0 else f'{keyword} state estimates {i}'
+    return {
+        'resource': {
+            'id': f'{keyword[:4]}-{i:04d}',
+            'name': name,
+            'description': 'Weekly counts by jurisdiction',
+            'updatedAt': f'{2010 + i % 12}-01-01T00:00:00.000Z',
+            'columns_name': ['fips', 'year'],
+        },
+        'metadata': {'domain': 'data.cdc.gov'},
+        'permalink': f'https://data.cdc.gov/d/{keyword[:4]}-{i:04d}',
+    }
+
+
+@pytest.fixture
+def catalog_server():
+    requests = []
+
+    class CatalogHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+            offset, limit = int(params['offset']), int(params['limit'])
+            first_try = not any(r['offset'] == offset and r['q'] == params['q'] for r in requests)
+            requests.append({'q': params['q'], 'offset': offset})
+            if offset == THROTTLED_OFFSET and first_try:
+                self.send_response(503)
+                self.send_header('Retry-After', '0')
+                self.end_headers()
+                return
+            if offset == DROPPED_OFFSET and first_try:
+                self.close_connection = True
+                return
+            results = [catalog_item(params['q'], i) for i in range(offset, min(offset + limit, N_RESULTS))]
+            body = json.dumps({'results': results, 'resultSetSize': N_RESULTS}).encode()
+            truncated = params['q'] == 'smoking' and offset == TRUNCATED_OFFSET and first_try
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body[:len(body) // 2] if truncated else body)
+            if truncated:
+                self.close_connection = True
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CatalogHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/api/catalog/v1', requests
+    server.shutdown()
+    server.server_close()
+
+
+def test_crawl_paginates_and_retries_transient_failures(catalog_server, monkeypatch):
+    monkeypatch.setattr(discover, 'BACKOFF_BASE', 0.01)
+    api_url, requests = catalog_server
+    crawled = asyncio.run(discover.crawl(['obesity', 'smoking'], api_url, max_concurrency=4,
+                                         requests_per_second=100))
+
+    assert [keyword for keyword, _ in crawled] == ['obesity', 'smoking']
+    for keyword, results in crawled:
+        ids = sorted(item['resource']['id'] for item in results)
+        assert ids == [f'{keyword[:4]}-{i:04d}' for i in range(N_RESULTS)]
+
+    attempts = {}
+    for r in requests:
+        attempts[r['q'], r['offset']] = attempts.get((r['q'], r['offset']), 0) + 1
+    assert sorted({offset for _, offset in attempts}) == [0, 100, 200]
+    assert attempts['obesity', THROTTLED_OFFSET] == 2
+    assert attempts['obesity', DROPPED_OFFSET] == 2
+    assert attempts['smoking', TRUNCATED_OFFSET] == 2
+    assert attempts['obesity', 0] == 1
+
+
+def test_search_runs_offline_with_fts_syntax_characters(catalog_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(discover, 'BACKOFF_BASE', 0.01)
+    api_url, _ = catalog_server
+    crawled = asyncio.run(discover.crawl(['obesity'], api_url, requests_per_second=100))
+    conn = discover.open_index(tmp_path / 'catalog.db')
+    assert discover.store_results(conn, crawled) == N_RESULTS
+
+    rows = discover.search_index(conn, 'covid-19')
+    assert len(rows) == N_RESULTS // 5
+    assert all('COVID-19' in row['name'] for row in rows)
+
+    rows = discover.search_index(conn, 'covid-19 county', updated_after='2020-01-01', county_only=True)
+    assert rows and all(row['updated_at'] >= '2020-01-01' and row['county_relevant'] for row in rows)
+    assert discover.search_index(conn, '"unbalanced quote') == []
+    assert len(discover.search_index(conn, '   ', limit=10)) == 10
+    conn.close()
@@ -0,0 +1,125 @@
+"""
+Row/column subsets, scikit-learn indexing and NumPy conversion for src/panel.py.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.panel import _compose, prepare_panel  # noqa: E402
+
+FEATURES = ['Poverty Rate', 'Snow Depth', 'Cattle', 'Wet Bulb Temperature']
+
+
+@pytest.fixture
+def panel_df():
+    rng = np.random.default_rng(0)
+    n_counties, years = 20, range(2012, 2017)
+    df = pd.DataFrame({
+        'County': [f'County {i}' for i in range(n_counties)] * len(years),
+        'State': [f'State {i % 4}' for i in range(n_counties)] * len(years),
+        'Year': np.repeat(list(years), n_counties),
+        'Fips': np.tile(np.arange(1001, 1001 + n_counties), len(years)),
+    })
+    for col in FEATURES:
+        df[col] = rng.normal(size=len(df))
+    df['Mean Life Expectancy'] = 78 + df['Poverty Rate'] + rng.normal(scale=0.1, size=len(df))
+    return df
+
+
+@pytest.fixture
+def panel(panel_df):
+    return prepare_panel(panel_df)
+
+
+def expected(df, rows, columns=FEATURES):
+    return df[columns].to_numpy(dtype=np.float32)[rows]
+
+
+def test_prepare_panel_matches_prepare_xy(panel, panel_df):
+    assert panel.shape == (len(panel_df), len(FEATURES))
+    assert list(panel.feature_names) == FEATURES
+    np.testing.assert_array_equal(panel.X, expected(panel_df, slice(None)))
+    np.testing.assert_array_equal(panel.groups, panel_df['Fips'].to_numpy())
+
+
+def test_compose_nested_subsets():
+    assert _compose(None, np.arange(3, 7), 10) == slice(3, 7)
+    np.testing.assert_array_equal(_compose(slice(2, 9), [0, 2, 4], 10), [2, 4, 6])
+    np.testing.assert_array_equal(_compose(np.array([9, 5, 1, 0]), [True, False, True, False], 10), [9, 1])
+    assert _compose(np.array([4, 5, 6, 7]), [1, 2], 10) == slice(5, 7)
+    assert _compose(None, 3, 10) == slice(3, 4)
+
+
+def test_nested_subsets_share_the_parent_array(panel, panel_df):
+    outer = panel.subset(rows=np.arange(10, 60))
+    inner = outer.subset(rows=np.arange(5, 15))
+    assert np.shares_memory(inner.X, panel.X)
+    np.testing.assert_array_equal(inner.X, expected(panel_df, slice(15, 25)))
+
+    picked = outer.subset(rows=[0, 7, 3], columns=['Cattle', 'Poverty Rate'])
+    np.testing.assert_array_equal(picked.X, expected(panel_df, [10, 17, 13], ['Cattle', 'Poverty Rate']))
+    assert picked.X is picked.X
+
+
+@pytest.mark.parametrize('key, rows, columns', [
+    ((np.array([3, 1, 4]), Ellipsis), [3, 1, 4], FEATURES),
+    ((slice(5, 9), slice(None)), slice(5, 9), FEATURES),
+    ((slice(0, 4), [0, 2]), slice(0, 4), ['Poverty Rate', 'Cattle']),
+    ((np.array([2, 8]), 3), [2, 8], ['Wet Bulb Temperature']),
+])
+def test_getitem_tuple_keys(panel, panel_df, key, rows, columns):
+    subset = panel[key]
+    assert list(subset.feature_names) == columns
+    np.testing.assert_array_equal(subset.X, expected(panel_df, rows, columns))
+
+
+def test_getitem_rejects_unsupported_keys(panel):
+    with pytest.raises(IndexError):
+        panel[..., 0]
+    with pytest.raises(IndexError):
+        panel[0, 0, 0]
+
+
+def test_sklearn_splits_return_panels(panel, panel_df):
+    from sklearn.model_selection import GroupKFold, train_test_split
+
+    train, test = train_test_split(panel, test_size=0.25, random_state=0)
+    assert len(train) + len(test) == len(panel)
+    assert train.shape[1] == len(FEATURES)
+
+    for train_idx, test_idx in GroupKFold(n_splits=4).split(panel, panel.y, groups=panel.groups):
+        np.testing.assert_array_equal(panel[test_idx, ...].X, expected(panel_df, test_idx))
+
+
+def test_where(panel, panel_df):
+    rows = panel.where(Year=range(2013, 2015), State=['State 1'])
+    mask = panel_df['Year'].isin([2013, 2014]) & (panel_df['State'] == 'State 1')
+    np.testing.assert_array_equal(rows, np.flatnonzero(mask))
+
+    later = panel.subset(rows=panel.where(Year=[2015, 2016]))
+    np.testing.assert_array_equal(later.where(Fips=[1003]), [2, 22])
+
+
+def test_array_copy_does_not_write_through(panel):
+    original = panel.X[0, 0]
+    for array in (np.array(panel), np.array(panel.subset(rows=slice(0, 10)), copy=True)):
+        array[0, 0] = 999
+        assert panel.X[0, 0] == original
+
+    assert np.shares_memory(np.asarray(panel), panel.X)
+    assert np.array(panel, dtype=np.float64).dtype == np.float64
+    with pytest.raises(ValueError):
+        np.array(panel, dtype=np.float64, copy=False)
+
+
+def test_to_frame_keeps_feature_names_for_xgboost(panel):
+    import xgboost as xgb
+
+    model = xgb.XGBRegressor(n_estimators=5).fit(panel.to_frame(), panel.y)
+    assert list(model.feature_names_in_) == FEATURES
+    assert model.get_booster().feature_names == FEATURES